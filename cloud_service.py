@@ -5,22 +5,48 @@ Runs continuous apartment monitoring as a background service
 """
 
 import asyncio
-import json
+import hmac
 import logging
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
 from datetime import datetime
+from collections import Counter
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, FastAPI, Header, Query, Request, HTTPException
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import orjson
 
 # Import our monitoring system
 from main import SpotEyeMonitor
-from config import get_config
+from config import get_config, reload_config
 
-# Global variables for managing the monitoring task
-monitor_instance = None
-monitoring_task = None
-is_monitoring_active = False
+# Short-lived cache of the /status response body
+STATUS_CACHE_TTL_SECONDS = 5.0
+# Apartments encoded per chunk when streaming the /status body
+STATUS_STREAM_BATCH_SIZE = 100
+# Default page size for the soon_available list in /status
+STATUS_DEFAULT_LIMIT = 50
+
+# Static part of the health check body, only status and timestamp vary
+_HEALTH_PREFIX = (
+    b'{"status":"healthy","service":"SpotEye Apartment Monitor",'
+    b'"version":"2.0.0","mode":"24/7 Continuous Monitoring","monitoring_status":"'
+)
+
+# Number of monitoring runs before the worker process is recycled
+MONITOR_PROCESS_MAX_RUNS = 10
+# Workers are spawned, not forked: the service process already runs threads (default executor,
+# log listener) whose held locks a forked child would inherit
+MONITOR_PROCESS_CONTEXT = multiprocessing.get_context('spawn')
+
+# Retry backoff after failed checks, and when to alert the administrator
+MAX_RETRY_BACKOFF_SECONDS = 3600
+CONSECUTIVE_FAILURE_THRESHOLD = 10
 
 # Configure logging for cloud environment
 logging.basicConfig(
@@ -30,56 +56,190 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def continuous_monitoring():
-    """Background task for continuous apartment monitoring"""
-    global monitor_instance, is_monitoring_active
+def _now_timestamp() -> str:
+    """Current time as a second-resolution ISO timestamp"""
+    return datetime.now().isoformat(timespec='seconds')
+
+
+@dataclass
+class MonitorState:
+    """Runtime state of the monitoring service, bound to the FastAPI app's lifetime"""
+    monitor: SpotEyeMonitor
+    task: Optional[asyncio.Task] = None
+    clock_task: Optional[asyncio.Task] = None
+    executor: Optional[ProcessPoolExecutor] = None
+    active: bool = False
+    last_error: Optional[str] = None
+    # Second-resolution timestamp shared by all request handlers
+    now_iso: str = field(default_factory=_now_timestamp)
+    # Serializes monitoring runs so only one Selenium session exists at a time
+    monitor_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Checks run by the current worker process, scheduled or manual
+    worker_runs: int = 0
+    # Requests currently using each monitor; a config reload closes the old one once unused
+    monitor_users: Counter = field(default_factory=Counter)
+    monitor_released: asyncio.Condition = field(default_factory=asyncio.Condition)
+    # Cached /status body as (monotonic time, body), rebuilt under status_lock
+    status_cache: Optional[Tuple[float, Dict]] = None
+    status_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+# Monitor owned by the worker process, reused so its Chrome driver persists between checks
+_worker_monitor = None
+
+
+def _run_monitor_subprocess():
+    """Run a single monitoring check in a worker process and return its statistics"""
+    global _worker_monitor
     
+    if _worker_monitor is None:
+        _worker_monitor = SpotEyeMonitor()
+    return _worker_monitor.run_once()
+
+
+def _close_worker_monitor():
+    """Quit the worker process's Chrome driver before the process exits"""
+    if _worker_monitor is not None:
+        _worker_monitor.close()
+
+
+def _shutdown_monitor_executor(executor: ProcessPoolExecutor):
+    """Close the worker's Chrome driver, then stop the worker process"""
+    try:
+        # Worker processes exit without running atexit hooks, so close Chrome explicitly
+        executor.submit(_close_worker_monitor).result(timeout=30)
+    except Exception as e:
+        logger.warning(f"Could not close worker Chrome driver: {e}")
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _recycle_monitor_executor(state: MonitorState):
+    """Replace the monitoring worker process so leaked Chrome memory is released"""
+    if state.executor:
+        _shutdown_monitor_executor(state.executor)
+    state.executor = ProcessPoolExecutor(max_workers=1, mp_context=MONITOR_PROCESS_CONTEXT)
+    state.worker_runs = 0
+    logger.info("Monitoring worker process recycled")
+
+
+async def _run_check_in_worker(state: MonitorState) -> Dict:
+    """Run one monitoring check in the worker process; the caller holds monitor_lock"""
+    loop = asyncio.get_running_loop()
+    state.worker_runs += 1
+    try:
+        stats = await loop.run_in_executor(state.executor, _run_monitor_subprocess)
+    except BrokenProcessPool:
+        # Worker crashed (e.g. OOM-killed Chrome), start a fresh one
+        await asyncio.to_thread(_recycle_monitor_executor, state)
+        raise
+    
+    if state.worker_runs >= MONITOR_PROCESS_MAX_RUNS:
+        await asyncio.to_thread(_recycle_monitor_executor, state)
+    return stats
+
+
+@asynccontextmanager
+async def _borrow_monitor(state: MonitorState):
+    """Yield the current monitor, keeping a config reload from closing it until released"""
+    monitor = state.monitor
+    state.monitor_users[monitor] += 1
+    try:
+        yield monitor
+    finally:
+        state.monitor_users[monitor] -= 1
+        if not state.monitor_users[monitor]:
+            del state.monitor_users[monitor]
+        async with state.monitor_released:
+            state.monitor_released.notify_all()
+
+
+async def _tick_clock(state: MonitorState):
+    """Refresh the shared request timestamp once per second"""
+    while True:
+        state.now_iso = _now_timestamp()
+        await asyncio.sleep(1.0)
+
+
+async def continuous_monitoring(state: MonitorState):
+    """Background task for continuous apartment monitoring"""
     logger.info("Starting 24/7 continuous monitoring...")
     
-    # Initialize monitor instance
-    monitor_instance = SpotEyeMonitor()
-    config = get_config()
-    interval_minutes = config['monitoring']['check_interval']
-    interval_seconds = interval_minutes * 60
+    failure_count = 0
     
-    is_monitoring_active = True
+    state.active = True
     
-    while is_monitoring_active:
+    while state.active:
         try:
             logger.info("=== Running apartment monitoring check ===")
-            monitor_instance.run_once()
-            logger.info(f"Monitoring check completed. Next check in {interval_minutes} minutes.")
+            # Run the Selenium scrape in an isolated worker process
+            async with state.monitor_lock:
+                stats = await _run_check_in_worker(state)
+            
+            # Read the interval after each check so a config reload applies to the next wait
+            interval_minutes = get_config()['monitoring']['check_interval']
+            logger.info(f"Monitoring check completed - Total: {stats['total']}. "
+                       f"Next check in {interval_minutes} minutes.")
+            
+            failure_count = 0
+            state.last_error = None
             
             # Wait for next check using asyncio.sleep (non-blocking)
-            await asyncio.sleep(interval_seconds)
+            await asyncio.sleep(interval_minutes * 60)
             
         except Exception as e:
             logger.error(f"Error in continuous monitoring: {e}")
-            logger.info(f"Retrying in {interval_minutes} minutes...")
-            await asyncio.sleep(interval_seconds)
+            state.last_error = str(e)
+            
+            # Back off exponentially so a persistent outage doesn't keep spawning Chrome
+            interval_seconds = get_config()['monitoring']['check_interval'] * 60
+            backoff_seconds = min(interval_seconds * (2 ** failure_count), MAX_RETRY_BACKOFF_SECONDS)
+            failure_count += 1
+            
+            if failure_count == CONSECUTIVE_FAILURE_THRESHOLD:
+                logger.critical(f"Monitoring failed {failure_count} times in a row, alerting administrator")
+                async with _borrow_monitor(state) as monitor:
+                    await asyncio.to_thread(monitor.notifier.send_failure_alert, failure_count, str(e))
+            
+            logger.info(f"Retrying in {backoff_seconds // 60} minutes...")
+            await asyncio.sleep(backoff_seconds)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager to handle startup and shutdown"""
-    global monitoring_task
-    
     # Startup: Start the continuous monitoring task
     logger.info("SpotEye service starting up...")
-    monitoring_task = asyncio.create_task(continuous_monitoring())
+    # Bound the worker threads used for blocking scrape/storage calls
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+    
+    # Single monitor and service state shared by all request handlers
+    state = MonitorState(monitor=SpotEyeMonitor())
+    state.executor = ProcessPoolExecutor(max_workers=1, mp_context=MONITOR_PROCESS_CONTEXT)
+    state.clock_task = asyncio.create_task(_tick_clock(state))
+    state.task = asyncio.create_task(continuous_monitoring(state))
+    app.state.monitor_state = state
     
     yield
     
     # Shutdown: Stop the monitoring task
     logger.info("SpotEye service shutting down...")
-    global is_monitoring_active
-    is_monitoring_active = False
-    if monitoring_task:
-        monitoring_task.cancel()
+    state.active = False
+    if state.task:
+        state.task.cancel()
         try:
-            await monitoring_task
+            await state.task
         except asyncio.CancelledError:
             pass
+    if state.clock_task:
+        state.clock_task.cancel()
+    if state.executor:
+        await asyncio.to_thread(_shutdown_monitor_executor, state.executor)
+    await asyncio.to_thread(state.monitor.close)
+
+
+async def get_state(request: Request) -> MonitorState:
+    """Dependency returning the service state created at startup"""
+    return request.app.state.monitor_state
 
 
 # Initialize FastAPI app with lifespan manager
@@ -87,51 +247,51 @@ app = FastAPI(
     title="SpotEye Apartment Monitor",
     description="24/7 continuous monitoring system for W|27 German student apartments",
     version="2.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
 
 @app.get("/")
-async def health_check():
+async def health_check(state: MonitorState = Depends(get_state)):
     """Health check endpoint for Cloud Run"""
-    global is_monitoring_active, monitor_instance
-    
-    status = "active" if is_monitoring_active else "inactive"
+    status = b'active' if state.active else b'inactive'
     
-    return {
-        'status': 'healthy',
-        'service': 'SpotEye Apartment Monitor',
-        'monitoring_status': status,
-        'timestamp': datetime.now().isoformat(),
-        'version': '2.0.0',
-        'mode': '24/7 Continuous Monitoring'
-    }
+    return Response(
+        _HEALTH_PREFIX + status + b'","timestamp":"' + state.now_iso.encode() + b'"}',
+        media_type='application/json'
+    )
 
 
 @app.post("/monitor")
 @app.get("/monitor")
-async def trigger_manual_monitoring(request: Request):
+async def trigger_manual_monitoring(state: MonitorState = Depends(get_state)):
     """Manual monitoring trigger endpoint (for testing purposes)"""
-    global monitor_instance
+    # Don't queue up behind a run that is already in progress
+    if state.monitor_lock.locked():
+        raise HTTPException(
+            status_code=429,
+            detail={
+                'status': 'busy',
+                'message': 'Monitoring already in progress',
+                'timestamp': state.now_iso
+            }
+        )
     
     try:
         logger.info("=== Manual monitoring trigger ===")
         
-        # Use existing monitor instance or create new one
-        if not monitor_instance:
-            monitor_instance = SpotEyeMonitor()
+        # Same worker process as the scheduled checks, so only one Chrome exists
+        async with state.monitor_lock:
+            stats = await _run_check_in_worker(state)
         
-        monitor_instance.run_once()
-        
-        # Get current statistics
-        historical_data = monitor_instance.storage.load_historical_data()
-        apartments = historical_data.get('apartments', [])
-        stats = monitor_instance.storage.get_statistics(apartments)
+        async with _borrow_monitor(state) as monitor:
+            historical_data = await monitor.storage.aload_historical_data()
         
         response_data = {
             'status': 'success',
             'message': 'Manual monitoring completed successfully',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': state.now_iso,
             'statistics': {
                 'total_apartments': stats['total'],
                 'by_status': stats['by_status'],
@@ -152,59 +312,121 @@ async def trigger_manual_monitoring(request: Request):
             detail={
                 'status': 'error',
                 'message': f'Manual monitoring failed: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': state.now_iso
             }
         )
 
 
-@app.get("/status")
-async def get_status():
-    """Get current system status and apartment data"""
-    global is_monitoring_active, monitor_instance
+async def _build_status(state: MonitorState):
+    """Build the /status response body from stored apartment data"""
+    # Load current data without blocking the event loop
+    async with _borrow_monitor(state) as monitor:
+        historical_data = await monitor.storage.aload_historical_data()
+    apartments = historical_data.get('apartments', [])
     
-    try:
-        # Use existing monitor instance or create new one
-        if not monitor_instance:
-            monitor_instance = SpotEyeMonitor()
-        
-        # Load current data
-        historical_data = monitor_instance.storage.load_historical_data()
-        apartments = historical_data.get('apartments', [])
+    config = get_config()
+    interval_minutes = config['monitoring']['check_interval']
+    
+    if apartments:
+        stats = monitor.storage.get_statistics(apartments)
         
-        config = get_config()
-        interval_minutes = config['monitoring']['check_interval']
+        return {
+            'status': 'success',
+            'monitoring_status': 'active' if state.active else 'inactive',
+            'last_error': state.last_error,
+            'monitoring_interval_minutes': interval_minutes,
+            'timestamp': state.now_iso,
+            'statistics': {
+                'total_apartments': stats['total'],
+                'by_status': stats['by_status'],
+                'by_type': stats['by_type'],
+                'price_stats': stats['price_stats'],
+                'last_check': historical_data.get('last_check', 'Never')
+            },
+            'soon_available': stats['soon_available']
+        }
+    else:
+        return {
+            'status': 'success',
+            'monitoring_status': 'active' if state.active else 'inactive',
+            'last_error': state.last_error,
+            'monitoring_interval_minutes': interval_minutes,
+            'message': 'No apartment data available yet',
+            'timestamp': state.now_iso
+        }
+
+
+async def _stream_status_body(body):
+    """Encode the /status body in chunks so the apartment list is never encoded at once"""
+    # Statistics can be keyed by None (e.g. rows without a type); encode those keys as "null"
+    # like the stdlib encoder did, since errors here surface after the headers are sent
+    apartments = body.get('soon_available')
+    if apartments is None:
+        yield orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS)
+        return
+    
+    head = {key: value for key, value in body.items() if key != 'soon_available'}
+    yield orjson.dumps(head, option=orjson.OPT_NON_STR_KEYS)[:-1] + b',"soon_available":['
+    
+    for start in range(0, len(apartments), STATUS_STREAM_BATCH_SIZE):
+        batch = apartments[start:start + STATUS_STREAM_BATCH_SIZE]
+        separator = b',' if start else b''
+        yield separator + b','.join(orjson.dumps(apt, option=orjson.OPT_NON_STR_KEYS) for apt in batch)
+    
+    yield b']}'
+
+
+def _paginate_status(body: Dict, limit: int, offset: int) -> Dict:
+    """Return a copy of the /status body with one page of soon_available (limit=0 means all)"""
+    apartments = body.get('soon_available')
+    if apartments is None:
+        return body
+    
+    page = apartments[offset:offset + limit] if limit else apartments[offset:]
+    return {
+        **body,
+        'soon_available': page,
+        'total_soon_available': len(apartments),
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def _status_response(body: Dict, limit: int, offset: int) -> StreamingResponse:
+    """Wrap one page of a /status body in a chunked JSON response"""
+    page = _paginate_status(body, limit, offset)
+    return StreamingResponse(_stream_status_body(page), media_type='application/json')
+
+
+def _get_cached_status(state: MonitorState):
+    """Return the cached /status body if it is still fresh"""
+    cache = state.status_cache
+    if cache and time.monotonic() - cache[0] < STATUS_CACHE_TTL_SECONDS:
+        return cache[1]
+    return None
+
+
+@app.get("/status")
+async def get_status(
+    limit: int = Query(STATUS_DEFAULT_LIMIT, ge=0),
+    offset: int = Query(0, ge=0),
+    state: MonitorState = Depends(get_state)
+):
+    """Get current system status and a page of soon/available apartments"""
+    try:
+        cached = _get_cached_status(state)
+        if cached is not None:
+            return _status_response(cached, limit, offset)
         
-        if apartments:
-            stats = monitor_instance.storage.get_statistics(apartments)
-            
-            # Filter for soon/available apartments
-            soon_available = [
-                apt for apt in apartments 
-                if apt.get('availability') in ['soon', 'available']
-            ]
+        # Only one request rebuilds the body, concurrent ones reuse its result
+        async with state.status_lock:
+            cached = _get_cached_status(state)
+            if cached is not None:
+                return _status_response(cached, limit, offset)
             
-            return {
-                'status': 'success',
-                'monitoring_status': 'active' if is_monitoring_active else 'inactive',
-                'monitoring_interval_minutes': interval_minutes,
-                'timestamp': datetime.now().isoformat(),
-                'statistics': {
-                    'total_apartments': stats['total'],
-                    'by_status': stats['by_status'],
-                    'by_type': stats['by_type'],
-                    'price_stats': stats['price_stats'],
-                    'last_check': historical_data.get('last_check', 'Never')
-                },
-                'soon_available': soon_available
-            }
-        else:
-            return {
-                'status': 'success',
-                'monitoring_status': 'active' if is_monitoring_active else 'inactive',
-                'monitoring_interval_minutes': interval_minutes,
-                'message': 'No apartment data available yet',
-                'timestamp': datetime.now().isoformat()
-            }
+            body = await _build_status(state)
+            state.status_cache = (time.monotonic(), body)
+            return _status_response(body, limit, offset)
             
     except Exception as e:
         logger.error(f"Status check failed: {str(e)}")
@@ -213,27 +435,24 @@ async def get_status():
             detail={
                 'status': 'error',
                 'message': f'Status check failed: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': state.now_iso
             }
         )
 
 
 @app.post("/test-email")
-async def test_email():
+async def test_email(state: MonitorState = Depends(get_state)):
     """Test email notification system"""
-    global monitor_instance
-    
     try:
-        if not monitor_instance:
-            monitor_instance = SpotEyeMonitor()
-            
-        success = monitor_instance.test_email()
+        # SMTP connect, login and send block; keep them off the event loop
+        async with _borrow_monitor(state) as monitor:
+            success = await asyncio.to_thread(monitor.test_email)
         
         return {
             'status': 'success' if success else 'failed',
             'message': 'Email test completed',
             'result': success,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': state.now_iso
         }
         
     except Exception as e:
@@ -243,13 +462,51 @@ async def test_email():
             detail={
                 'status': 'error',
                 'message': f'Email test failed: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': state.now_iso
             }
         )
 
 
+def _require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Dependency rejecting requests without the ADMIN_TOKEN from the environment"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    if not expected:
+        # No token configured: admin routes are disabled
+        raise HTTPException(status_code=403, detail={'status': 'error', 'message': 'Admin API disabled'})
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail={'status': 'error', 'message': 'Invalid admin token'})
+
+
+@app.post("/admin/reload-config", dependencies=[Depends(_require_admin_token)])
+async def admin_reload_config(state: MonitorState = Depends(get_state)):
+    """Reload configuration from environment and .env file and apply it to the running service"""
+    config = reload_config()
+    
+    # Wait for any running check, then swap in components built from the new config;
+    # the monitoring loop re-reads the interval before its next wait
+    async with state.monitor_lock:
+        old_monitor = state.monitor
+        state.monitor = await asyncio.to_thread(SpotEyeMonitor)
+        # The new worker process builds its monitor from the reloaded config
+        await asyncio.to_thread(_recycle_monitor_executor, state)
+    state.status_cache = None
+    
+    # Requests that borrowed the old monitor finish with it before it is closed
+    async with state.monitor_released:
+        await state.monitor_released.wait_for(lambda: old_monitor not in state.monitor_users)
+    await asyncio.to_thread(old_monitor.close)
+    logger.info("Configuration reloaded and applied")
+    
+    return {
+        'status': 'success',
+        'message': 'Configuration reloaded; the new interval applies from the next wait',
+        'monitoring_interval_minutes': config['monitoring']['check_interval'],
+        'timestamp': state.now_iso
+    }
+
+
 if __name__ == '__main__':
     import uvicorn
     # For local development
     port = int(os.environ.get('PORT', 8080))
-    uvicorn.run(app, host='0.0.0.0', port=port) 
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=port, loop='uvloop', http='httptools') 
\ No newline at end of file
@@ -5,9 +5,11 @@ Centralized configuration for all application components
 """
 
 import os
+from functools import lru_cache
 from typing import Dict
 
 
+@lru_cache(maxsize=1)
 def load_env_file():
     """Load environment variables from .env file if it exists"""
     if os.path.exists('.env'):
@@ -19,8 +21,9 @@ def load_env_file():
                     os.environ[key.strip()] = value.strip()
 
 
+@lru_cache(maxsize=1)
 def get_config() -> Dict:
-    """Get complete configuration for SpotEye application"""
+    """Get complete configuration for SpotEye application (cached, treat as read-only)"""
     # Load environment variables from .env file if available
     load_env_file()
     
@@ -28,13 +31,19 @@ def get_config() -> Dict:
         'email': {
             'smtp_server': 'smtp.gmail.com',
             'smtp_port': 587,
+            'smtp_timeout': 30,  # Seconds before a blocked SMTP connect or command fails
             'smtp_user': os.environ.get('SMTP_USER', 'tanga6998@gmail.com'),  # Sender email address
             'smtp_password': os.environ.get('SMTP_PASSWORD', ''),  # Gmail app-specific password from env
-            'recipient_email': os.environ.get('RECIPIENT_EMAIL', 'tr1173309602@gmail.com')  # Recipient email address
+            'recipient_email': os.environ.get('RECIPIENT_EMAIL', 'tr1173309602@gmail.com'),  # Recipient email address
+            'max_messages_per_connection': 50,  # Messages sent over one SMTP session before reconnecting
+            'per_item_notifications': False,  # Send one email per change instead of a single digest
+            'batch_size': 1,  # Changes to accumulate before sending; 1 sends every check's changes at once
+            'batch_max_age_seconds': 0  # Send held-back changes once the oldest is this old
         },
         
         'monitoring': {
             'target_url': 'https://www.apartments-hn.de/en/book-apartment',
+            'extra_urls': [],      # Additional pages to monitor, scraped in tabs of the same browser
             'check_interval': 3,  # Check interval in minutes (changed to 3 minutes for immediate notifications)
             'retry_attempts': 3,   # Number of retry attempts on failure
             'timeout': 30,         # Page load timeout in seconds
@@ -42,7 +51,8 @@ def get_config() -> Dict:
         },
         
         'data_storage': {
-            'file_path': 'apartment_data.json',
+            'db_path': 'apartment_data.db',         # SQLite database (WAL mode)
+            'file_path': 'apartment_data.json',     # Legacy JSON data file, imported once if present
             'backup_enabled': True,
             'backup_interval': 24  # Hours between backups
         },
@@ -51,11 +61,14 @@ def get_config() -> Dict:
             'headless': True,      # Headless mode (background execution)
             'window_size': '1920,1080',
             'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'chromedriver_path': None  # Set to specific path if using manual ChromeDriver
+            'chromedriver_path': None,  # Set to specific path if using manual ChromeDriver
+            'driver_max_runs': 20,  # Monitoring runs before the reused Chrome driver is restarted
+            'concurrency': 4,  # Pages fetched in parallel when monitoring several URLs
+            'capture_api_responses': False  # Log the page's JSON XHR/fetch endpoints (via CDP) to find a direct data source
         },
         
         'logging': {
-            'level': 'INFO',  # DEBUG, INFO, WARNING, ERROR
+            'level': os.environ.get('LOG_LEVEL', 'INFO').upper(),  # DEBUG, INFO, WARNING, ERROR
             'format': '%(asctime)s - %(levelname)s - %(message)s',
             'file': 'spotEye.log'
         }
@@ -63,10 +76,18 @@ def get_config() -> Dict:
 
 
 # Legacy support for existing configurations
-EMAIL_CONFIG = get_config()['email']
-MONITOR_CONFIG = get_config()['monitoring']
+_config = get_config()
+EMAIL_CONFIG = _config['email']
+MONITOR_CONFIG = _config['monitoring']
 DATA_CONFIG = {
-    'data_file': get_config()['data_storage']['file_path'],
-    'log_file': get_config()['logging']['file']
+    'data_file': _config['data_storage']['file_path'],
+    'log_file': _config['logging']['file']
 }
-BROWSER_CONFIG = get_config()['browser'] 
\ No newline at end of file
+BROWSER_CONFIG = _config['browser']
+
+
+def reload_config() -> Dict:
+    """Drop cached configuration and re-read the .env file"""
+    load_env_file.cache_clear()
+    get_config.cache_clear()
+    return get_config() 
\ No newline at end of file
@@ -3,16 +3,92 @@
 Manual ChromeDriver download utility for SpotEye
 """
 
+import hashlib
+import json
 import os
 import platform
+import shutil
 import zipfile
 import requests
 import subprocess
-import json
 from pathlib import Path
 
+# Chunk size for streaming downloads, hashing and extraction
+CHUNK_SIZE = 64 * 1024
+
+# Detected Chrome version, keyed by the Chrome executable's mtime
+VERSION_CACHE_PATH = Path("drivers") / ".chrome_version.json"
+
+WINDOWS_CHROME_PATH = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+MAC_CHROME_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+
+def get_chrome_executable():
+    """Get the path of the installed Chrome executable, if known"""
+    system = platform.system()
+    if system == "Windows":
+        return Path(WINDOWS_CHROME_PATH)
+    elif system == "Darwin":
+        return Path(MAC_CHROME_PATH)
+    elif system == "Linux":
+        found = shutil.which("google-chrome")
+        return Path(found) if found else None
+    return None
+
 def get_chrome_version():
-    """Get installed Chrome version"""
+    """Get installed Chrome version, reusing the cached result while Chrome is unchanged"""
+    mtime_ns = None
+    executable = get_chrome_executable()
+    if executable:
+        try:
+            mtime_ns = executable.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+    
+    if mtime_ns is not None:
+        try:
+            cached = json.loads(VERSION_CACHE_PATH.read_text(encoding='utf-8'))
+            if cached.get('mtime_ns') == mtime_ns and cached.get('version'):
+                return cached['version']
+        except (OSError, ValueError):
+            pass
+    
+    version = detect_chrome_version()
+    
+    if version and mtime_ns is not None:
+        try:
+            VERSION_CACHE_PATH.parent.mkdir(exist_ok=True)
+            VERSION_CACHE_PATH.write_text(json.dumps({'mtime_ns': mtime_ns, 'version': version}), encoding='utf-8')
+        except OSError as e:
+            print(f"Could not cache Chrome version: {e}")
+    
+    return version
+
+def read_windows_product_version(path):
+    """Read the ProductVersion resource of a Windows executable without a subprocess"""
+    import ctypes
+    from ctypes import wintypes
+    
+    version_dll = ctypes.windll.version
+    size = version_dll.GetFileVersionInfoSizeW(str(path), None)
+    if not size:
+        return None
+    
+    buffer = ctypes.create_string_buffer(size)
+    if not version_dll.GetFileVersionInfoW(str(path), 0, size, buffer):
+        return None
+    
+    info = ctypes.c_void_p()
+    length = wintypes.UINT()
+    if not version_dll.VerQueryValueW(buffer, "\\", ctypes.byref(info), ctypes.byref(length)):
+        return None
+    
+    # VS_FIXEDFILEINFO: the product version is held in its 5th and 6th DWORDs
+    fixed_info = ctypes.cast(info, ctypes.POINTER(wintypes.DWORD * 6)).contents
+    version_ms, version_ls = fixed_info[4], fixed_info[5]
+    return f"{version_ms >> 16}.{version_ms & 0xFFFF}.{version_ls >> 16}.{version_ls & 0xFFFF}"
+
+def detect_chrome_version():
+    """Detect installed Chrome version by probing the system"""
     try:
         if platform.system() == "Windows":
             # Try to get Chrome version from registry or executable
@@ -23,17 +99,12 @@ def get_chrome_version():
                 winreg.CloseKey(key)
                 return version
             except:
-                # Alternative method using command line
-                result = subprocess.run([
-                    "powershell", "-command", 
-                    "(Get-Item 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe').VersionInfo.ProductVersion"
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    return result.stdout.strip()
+                # Alternative method reading the executable's version resource
+                return read_windows_product_version(WINDOWS_CHROME_PATH)
         
         elif platform.system() == "Darwin":  # macOS
             result = subprocess.run([
-                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"
+                MAC_CHROME_PATH, "--version"
             ], capture_output=True, text=True)
             if result.returncode == 0:
                 return result.stdout.split()[-1]
@@ -48,6 +119,19 @@ def get_chrome_version():
         
     return None
 
+def get_platform_key():
+    """Get the chrome-for-testing platform key for this machine"""
+    system = platform.system().lower()
+    arch = platform.machine().lower()
+    
+    platform_map = {
+        'windows': 'win32' if '32' in arch else 'win64',
+        'darwin': 'mac-arm64' if 'arm' in arch else 'mac-x64',
+        'linux': 'linux64'
+    }
+    
+    return platform_map.get(system, 'win64')  # Default to win64
+
 def get_chromedriver_url(chrome_version):
     """Get the appropriate ChromeDriver download URL"""
     # Get the major version
@@ -64,16 +148,7 @@ def get_chromedriver_url(chrome_version):
             downloads = version_info.get('downloads', {}).get('chromedriver', [])
             
             # Select appropriate platform
-            system = platform.system().lower()
-            arch = platform.machine().lower()
-            
-            platform_map = {
-                'windows': 'win32' if '32' in arch else 'win64',
-                'darwin': 'mac-arm64' if 'arm' in arch else 'mac-x64',
-                'linux': 'linux64'
-            }
-            
-            platform_key = platform_map.get(system, 'win64')  # Default to win64
+            platform_key = get_platform_key()
             
             for download in downloads:
                 if download['platform'] == platform_key:
@@ -81,6 +156,38 @@ def get_chromedriver_url(chrome_version):
     
     return None, None
 
+def file_sha256(path):
+    """Compute the SHA-256 hex digest of a file in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_cached_archive_valid(zip_path, hash_path, url):
+    """Check whether the cached archive was downloaded from url and is intact"""
+    if not zip_path.is_file() or not hash_path.is_file():
+        return False
+    
+    recorded = hash_path.read_text(encoding='utf-8').split()
+    if len(recorded) != 2 or recorded[1] != url:
+        return False
+    
+    return file_sha256(zip_path) == recorded[0]
+
+def extract_chromedriver(zip_path, drivers_dir, binary_name):
+    """Extract only the chromedriver binary and its license from the archive"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            name = Path(member.filename).name
+            if member.is_dir() or not (name == binary_name or name.startswith('LICENSE')):
+                continue
+            
+            target = drivers_dir / member.filename
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with zip_ref.open(member) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
 def download_chromedriver():
     """Download and setup ChromeDriver manually"""
     print("=== Manual ChromeDriver Download ===")
@@ -106,30 +213,32 @@ def download_chromedriver():
     drivers_dir = Path("drivers")
     drivers_dir.mkdir(exist_ok=True)
     
-    # Download ChromeDriver
-    print("Downloading ChromeDriver...")
-    response = requests.get(url)
     zip_path = drivers_dir / "chromedriver.zip"
+    hash_path = drivers_dir / ".sha256"
     
-    with open(zip_path, 'wb') as f:
-        f.write(response.content)
+    # The chrome-for-testing archive layout is chromedriver-<platform>/chromedriver[.exe]
+    binary_name = 'chromedriver.exe' if platform.system() == "Windows" else 'chromedriver'
+    chromedriver_path = drivers_dir / f"chromedriver-{get_platform_key()}" / binary_name
     
-    # Extract ChromeDriver
-    print("Extracting ChromeDriver...")
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(drivers_dir)
-    
-    # Find the chromedriver executable
-    chromedriver_path = None
-    for root, dirs, files in os.walk(drivers_dir):
-        for file in files:
-            if file.startswith('chromedriver') and (file.endswith('.exe') or not '.' in file):
-                chromedriver_path = Path(root) / file
-                break
-        if chromedriver_path:
-            break
-    
-    if chromedriver_path:
+    if is_cached_archive_valid(zip_path, hash_path, url) and chromedriver_path.is_file():
+        print("ChromeDriver archive is up to date, skipping download")
+    else:
+        # Download ChromeDriver, hashing while streaming the archive to disk
+        print("Downloading ChromeDriver...")
+        digest = hashlib.sha256()
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(zip_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+        hash_path.write_text(f"{digest.hexdigest()} {url}\n", encoding='utf-8')
+        
+        # Extract ChromeDriver
+        print("Extracting ChromeDriver...")
+        extract_chromedriver(zip_path, drivers_dir, binary_name)
+    
+    if chromedriver_path.is_file():
         # Make executable on Unix systems
         if platform.system() != "Windows":
             os.chmod(chromedriver_path, 0o755)
@@ -139,9 +248,6 @@ def download_chromedriver():
         print("1. Add the drivers directory to your PATH")
         print("2. Update config.py to specify the path")
         
-        # Clean up zip file
-        zip_path.unlink()
-        
         return True
     else:
         print("Failed to find ChromeDriver executable after extraction.")
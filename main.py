@@ -4,16 +4,23 @@ SpotEye Apartment Monitoring System - Main Application
 A monitoring system for W|27 German student apartments
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict
 
 from config import get_config
-from scraper import ApartmentScraper
 from storage import ApartmentStorage
 from notification import EmailNotifier
 
+if TYPE_CHECKING:
+    from scraper import ApartmentScraper
+
 
 class SpotEyeMonitor:
     """Main application class that coordinates all monitoring components"""
@@ -23,10 +30,9 @@ class SpotEyeMonitor:
         self.config = get_config()
         self.setup_logging()
         
-        # Initialize components
-        self.scraper = ApartmentScraper(self.config, self.logger)
-        self.storage = ApartmentStorage(self.config, self.logger)
-        self.notifier = EmailNotifier(self.config, self.logger)
+        # Single worker sends notifications in the background; one thread keeps the
+        # notifier's shared SMTP session from being used concurrently
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spoteye-io')
         
         self.logger.info("SpotEye monitoring system initialized")
     
@@ -35,74 +41,162 @@ class SpotEyeMonitor:
         log_level = getattr(logging, self.config['logging']['level'])
         log_format = self.config['logging']['format']
         
-        logging.basicConfig(
-            level=log_level,
-            format=log_format,
-            handlers=[
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler(self.config['logging']['file'], encoding='utf-8')
-            ]
-        )
+        # Log calls only enqueue the record; a listener thread does the console and file I/O.
+        # basicConfig is a no-op when the root logger is already configured (e.g. by the service)
+        self._log_listener = None
+        if not logging.getLogger().handlers:
+            formatter = logging.Formatter(log_format)
+            stream_handler = logging.StreamHandler(sys.stdout)
+            file_handler = logging.FileHandler(self.config['logging']['file'], encoding='utf-8')
+            stream_handler.setFormatter(formatter)
+            file_handler.setFormatter(formatter)
+            
+            log_queue = queue.Queue(-1)
+            self._log_listener = logging.handlers.QueueListener(
+                log_queue, stream_handler, file_handler, respect_handler_level=True
+            )
+            self._log_listener.start()
+            atexit.register(self.stop_logging)
+            
+            # The queue handler only merges the message arguments; the listener's handlers format
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            queue_handler.setFormatter(logging.Formatter('%(message)s'))
+            logging.basicConfig(level=log_level, handlers=[queue_handler])
         
         self.logger = logging.getLogger(__name__)
         self.logger.info("Logging system initialized")
 
-    def run_once(self):
-        """Execute monitoring once"""
+    # Components are created on first use, so e.g. --status never starts a scraper
+
+    @cached_property
+    def scraper(self) -> 'ApartmentScraper':
+        """Website scraper"""
+        # Imported here so commands that never scrape skip loading selenium and lxml
+        from scraper import ApartmentScraper
+        return ApartmentScraper(self.config, self.logger)
+
+    @cached_property
+    def storage(self) -> ApartmentStorage:
+        """Apartment data storage"""
+        return ApartmentStorage(self.config, self.logger)
+
+    @cached_property
+    def notifier(self) -> EmailNotifier:
+        """Email notifier"""
+        return EmailNotifier(self.config, self.logger)
+
+    def stop_logging(self):
+        """Flush queued log records and stop the background log listener"""
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+    def run_once(self) -> Dict:
+        """Execute monitoring once and return statistics for the current data"""
         self.logger.info("Starting monitoring execution...")
         
         try:
             # 1. Scrape current data
-            current_apartments = self.scraper.scrape_apartments()
-            self.logger.info(f"Retrieved {len(current_apartments)} apartment listings")
-            
-            # 2. Load historical data
-            historical_data = self.storage.load_historical_data()
+            extra_urls = self.config['monitoring'].get('extra_urls', [])
+            if extra_urls:
+                urls = [self.config['monitoring']['target_url'], *extra_urls]
+                current_apartments = self.scraper.scrape_all(urls)
+            else:
+                current_apartments = self.scraper.scrape_apartments()
+            self.logger.info("Retrieved %d apartment listings", len(current_apartments))
             
-            # 3. Detect changes
-            changes = self.storage.detect_changes(current_apartments, historical_data)
+            # 2-3. Detect changes against the stored status and date columns; the full
+            # historical records are not needed for this
+            changes = self.storage.detect_stored_changes(current_apartments)
             
-            # 4. Send notifications
+            # 4. Send notifications in the background while the data is saved
             if changes:
-                self.logger.info(f"Found {len(changes)} changes")
-                self.notifier.send_notification(changes)
+                self.logger.info("Found %d changes", len(changes))
             else:
                 self.logger.info("No changes found")
             
+            # The notifier may hold changes back to batch them; an empty call still sends a due batch
+            notification = None
+            if changes or self.notifier.has_pending_changes():
+                notification = self._io_pool.submit(self.notifier.enqueue, changes)
+            
             # 5. Save current data
             updated_data = self.storage.create_updated_data(current_apartments)
             self.storage.save_data(updated_data)
             
-            # 6. Log statistics
+            # Surface any notification error before reporting the run as complete
+            if notification is not None:
+                notification.result()
+            
+            # 6. Log statistics, from the scraped list rather than reloading what was saved
             stats = self.storage.get_statistics(current_apartments)
-            self.logger.info(f"Monitoring complete - Total: {stats['total']}, "
-                           f"Available: {stats['by_status'].get('available', 0)}, "
-                           f"Soon: {stats['by_status'].get('soon', 0)}")
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Monitoring complete - Total: %d, Available: %d, Soon: %d",
+                                 stats['total'],
+                                 stats['by_status'].get('available', 0),
+                                 stats['by_status'].get('soon', 0))
+            
+            return stats
             
         except Exception as e:
-            self.logger.error(f"Monitoring execution failed: {e}")
+            self.logger.error("Monitoring execution failed: %s", e)
             raise
 
     def run_continuous(self):
         """Run monitoring continuously with configured intervals"""
         interval = self.config['monitoring']['check_interval']
-        self.logger.info(f"Starting continuous monitoring with {interval} minute intervals")
+        self.logger.info("Starting continuous monitoring with %s minute intervals", interval)
+        
+        period = interval * 60  # Convert minutes to seconds
+        next_run = time.monotonic()
         
         while True:
             try:
-                self.run_once()
+                try:
+                    self.run_once()
+                    self.logger.info("Waiting %s minutes until next check...", interval)
+                except Exception as e:
+                    self.logger.error("Error in continuous monitoring: %s", e)
+                    self.logger.info("Retrying in %s minutes...", interval)
                 
-                # Wait for next check
-                self.logger.info(f"Waiting {interval} minutes until next check...")
-                time.sleep(interval * 60)  # Convert minutes to seconds
+                # Schedule against fixed deadlines so the time spent checking doesn't add drift
+                next_run += period
+                sleep_for = next_run - time.monotonic()
+                if sleep_for < 0:
+                    # The check overran its slot; skip it rather than running back to back
+                    next_run = time.monotonic() + period
+                    sleep_for = period
+                time.sleep(sleep_for)
                 
             except KeyboardInterrupt:
                 self.logger.info("Monitoring stopped by user")
+                # Send held-back notifications, then log out of the cached SMTP session
+                self._drain_notifications()
+                self.notifier.close()
+                self.stop_logging()
                 break
-            except Exception as e:
-                self.logger.error(f"Error in continuous monitoring: {e}")
-                self.logger.info(f"Retrying in {interval} minutes...")
-                time.sleep(interval * 60)
+
+    def close(self):
+        """Release resources held by the monitoring components"""
+        # Only close the components that were actually created
+        if 'scraper' in self.__dict__:
+            self.scraper.close()
+        self._drain_notifications()
+        if 'notifier' in self.__dict__:
+            self.notifier.close()
+            # Closed for good; don't keep this notifier alive until exit (e.g. after a config reload)
+            atexit.unregister(self.notifier.close)
+        if 'storage' in self.__dict__:
+            self.storage.close()
+
+    def _drain_notifications(self):
+        """Send any held-back notifications and stop the background sender"""
+        if self._io_pool is None:
+            return
+        if 'notifier' in self.__dict__:
+            self._io_pool.submit(self.notifier.flush)
+        self._io_pool.shutdown(wait=True)
+        self._io_pool = None
 
     def test_email(self):
         """Test email notification system"""
@@ -117,7 +211,7 @@ class SpotEyeMonitor:
             return success
             
         except Exception as e:
-            self.logger.error(f"Email test failed: {e}")
+            self.logger.error("Email test failed: %s", e)
             print(f"❌ Email test failed: {e}")
             return False
 
@@ -159,10 +253,17 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='SpotEye Apartment Monitoring System')
-    parser.add_argument('--once', action='store_true', help='Run monitoring once and exit')
-    parser.add_argument('--continuous', action='store_true', help='Run continuous monitoring')
-    parser.add_argument('--test-email', action='store_true', help='Test email notification')
-    parser.add_argument('--status', action='store_true', help='Show system status')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.add_parser('once', help='Run monitoring once and exit')
+    subparsers.add_parser('continuous', help='Run continuous monitoring')
+    subparsers.add_parser('test-email', help='Test email notification')
+    subparsers.add_parser('status', help='Show system status')
+    
+    # Legacy flag forms of the commands above
+    parser.add_argument('--once', dest='command', action='store_const', const='once', help=argparse.SUPPRESS)
+    parser.add_argument('--continuous', dest='command', action='store_const', const='continuous', help=argparse.SUPPRESS)
+    parser.add_argument('--test-email', dest='command', action='store_const', const='test-email', help=argparse.SUPPRESS)
+    parser.add_argument('--status', dest='command', action='store_const', const='status', help=argparse.SUPPRESS)
     
     args = parser.parse_args()
     
@@ -170,16 +271,17 @@ def main():
     print("Initializing...")
     
     try:
+        # Each command only creates the components it uses
         monitor = SpotEyeMonitor()
         
-        if args.test_email:
+        if args.command == 'test-email':
             monitor.test_email()
-        elif args.status:
+        elif args.command == 'status':
             monitor.show_status()
-        elif args.once:
+        elif args.command == 'once':
             monitor.run_once()
             print("Single monitoring run completed!")
-        elif args.continuous:
+        elif args.command == 'continuous':
             monitor.run_continuous()
         else:
             # Default: show help and run once
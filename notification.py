@@ -4,213 +4,378 @@ SpotEye Notification Module
 Handles email notifications for apartment changes
 """
 
+import atexit
+import html
 import logging
 import smtplib
+import threading
+import time
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-
-class EmailNotifier:
-    """Email notification service for apartment changes"""
-    
-    def __init__(self, config: Dict, logger: logging.Logger):
-        """Initialize notifier with configuration and logger"""
-        self.config = config
-        self.logger = logger
-        self.email_config = config['email']
-
-    def send_notification(self, changes: List[Dict]):
-        """Send email notification about apartment changes"""
-        try:
-            if not changes:
-                self.logger.info("No changes to report, skipping email notification")
-                return
-            
-            # Create email content
-            subject = f"🏠 SpotEye Alert: {len(changes)} Apartment Updates Available!"
-            html_content = self._create_email_content(changes)
-            
-            # Send email
-            self._send_email(subject, html_content)
-            
-            self.logger.info(f"Successfully sent notification email for {len(changes)} changes")
-            
-        except Exception as e:
-            self.logger.error(f"Failed to send notification: {e}")
-    
-    def _create_email_content(self, changes: List[Dict]) -> str:
-        """Create HTML email content for apartment changes"""
-        
-        new_apartments = [c for c in changes if c['type'] == 'new']
-        status_changes = [c for c in changes if c['type'] == 'status_change']
-        date_changes = [c for c in changes if c['type'] == 'date_change']
-        
-        html_content = f"""
+# Static head and stylesheet of the change notification email
+CHANGE_EMAIL_PRELUDE = """
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="UTF-8">
             <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                .container {{ max-width: 800px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                .header {{ background-color: #4CAF50; color: white; padding: 20px; border-radius: 8px; text-align: center; margin-bottom: 20px; }}
-                .section {{ margin: 20px 0; }}
-                .apartment {{ background-color: #f9f9f9; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid #4CAF50; }}
-                .apartment.new {{ border-left-color: #2196F3; }}
-                .apartment.status {{ border-left-color: #FF9800; }}
-                .apartment.date {{ border-left-color: #9C27B0; }}
-                .details {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 10px; margin-top: 10px; }}
-                .detail {{ background-color: white; padding: 8px; border-radius: 4px; }}
-                .label {{ font-weight: bold; color: #555; }}
-                .value {{ color: #333; }}
-                .urgent {{ background-color: #FFE0E0; border-left-color: #F44336 !important; }}
-                .footer {{ text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }}
-                .apply-link {{ background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 10px; }}
+                body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+                .container { max-width: 800px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+                .header { background-color: #4CAF50; color: white; padding: 20px; border-radius: 8px; text-align: center; margin-bottom: 20px; }
+                .section { margin: 20px 0; }
+                .apartment { background-color: #f9f9f9; padding: 15px; margin: 10px 0; border-radius: 8px; border-left: 4px solid #4CAF50; }
+                .apartment.new { border-left-color: #2196F3; }
+                .apartment.status { border-left-color: #FF9800; }
+                .apartment.date { border-left-color: #9C27B0; }
+                .details { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 10px; margin-top: 10px; }
+                .detail { background-color: white; padding: 8px; border-radius: 4px; }
+                .label { font-weight: bold; color: #555; }
+                .value { color: #333; }
+                .urgent { background-color: #FFE0E0; border-left-color: #F44336 !important; }
+                .footer { text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }
+                .apply-link { background-color: #4CAF50; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 10px; }
             </style>
         </head>
         <body>
             <div class="container">
-                <div class="header">
+"""
+
+CHANGE_EMAIL_HEADER_TEMPLATE = """                <div class="header">
                     <h1>🏠 SpotEye Apartment Monitor</h1>
                     <p>New apartment opportunities detected!</p>
-                    <p>Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                    <p>Checked at: {checked_at}</p>
                 </div>
         """
-        
-        # New apartments section
-        if new_apartments:
-            html_content += f"""
-                <div class="section">
-                    <h2>🆕 New Apartments ({len(new_apartments)})</h2>
+
+CHANGE_EMAIL_FOOTER = """
+                <div class="footer">
+                    <p>🤖 This message was sent automatically by SpotEye</p>
+                    <p>Monitoring: <a href="https://www.apartments-hn.de/en/book-apartment">W|27 German Student Apartments</a></p>
+                    <p><small>To stop receiving these notifications, please contact your system administrator.</small></p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+# Test notification email, split into its static head and the timestamped body
+TEST_EMAIL_PRELUDE = """
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <meta charset="UTF-8">
+                <style>
+                    body { font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }
+                    .container { max-width: 600px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+                    .header { background-color: #4CAF50; color: white; padding: 20px; border-radius: 8px; text-align: center; margin-bottom: 20px; }
+                    .content { text-align: center; padding: 20px; }
+                    .footer { text-align: center; margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }
+                </style>
+            </head>
+            <body>
+"""
+
+TEST_EMAIL_BODY_TEMPLATE = """                <div class="container">
+                    <div class="header">
+                        <h1>🧪 SpotEye Test</h1>
+                        <p>Email Configuration Test</p>
+                    </div>
+                    <div class="content">
+                        <h2>✅ Email System Working!</h2>
+                        <p>This is a test message to verify that your SpotEye email notification system is properly configured.</p>
+                        <p><strong>Sent at:</strong> {sent_at}</p>
+                        <p>If you received this message, your email notifications are ready to go!</p>
+                    </div>
+                    <div class="footer">
+                        <p>🤖 SpotEye Apartment Monitor</p>
+                        <p><small>This is an automated test message.</small></p>
+                    </div>
+                </div>
+            </body>
+            </html>
             """
-            
-            for change in new_apartments:
-                apt = change['apartment']
-                urgent_class = 'urgent' if apt.get('availability') in ['available', 'soon'] else ''
-                
-                html_content += f"""
+
+# Per-change HTML blocks of the notification email, filled with str.format_map
+NEW_APARTMENT_TEMPLATE = """
                     <div class="apartment new {urgent_class}">
-                        <h3>Apartment {apt.get('id', 'N/A')} - {apt.get('type', 'Unknown')} Room</h3>
+                        <h3>Apartment {id} - {type_name} Room</h3>
                         <div class="details">
                             <div class="detail">
                                 <div class="label">Floor:</div>
-                                <div class="value">{apt.get('floor', 'N/A')}</div>
+                                <div class="value">{floor}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Location:</div>
-                                <div class="value">{apt.get('location', 'N/A')}</div>
+                                <div class="value">{location}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Size:</div>
-                                <div class="value">{apt.get('size', 'N/A')} m²</div>
+                                <div class="value">{size} m²</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Price:</div>
-                                <div class="value">€{apt.get('price', 'N/A')}/month</div>
+                                <div class="value">€{price}/month</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Balcony:</div>
-                                <div class="value">{apt.get('balcony', 'N/A').title()}</div>
+                                <div class="value">{balcony_title}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Status:</div>
-                                <div class="value">{apt.get('availability', 'N/A').title()}</div>
+                                <div class="value">{availability_title}</div>
                             </div>
                         </div>
-                        {f'<div style="margin-top: 10px;"><strong>Available from: {apt.get("available_date")}</strong></div>' if apt.get('available_date') else ''}
-                        {f'<div style="margin-top: 5px; color: #4CAF50;"><strong>✅ Barrier-free accessible</strong></div>' if apt.get('barrier_free') else ''}
+                        {available_from}
+                        {barrier_free_note}
                         <a href="https://www.apartments-hn.de/en/book-apartment" class="apply-link">View on Website</a>
                     </div>
                 """
-            
-            html_content += "</div>"
-        
-        # Status changes section
-        if status_changes:
-            html_content += f"""
-                <div class="section">
-                    <h2>📈 Availability Changes ({len(status_changes)})</h2>
-            """
-            
-            for change in status_changes:
-                apt = change['apartment']
-                old_status = change['old_status']
-                new_status = change['new_status']
-                urgent_class = 'urgent' if new_status in ['available', 'soon'] else ''
-                
-                html_content += f"""
+
+STATUS_CHANGE_TEMPLATE = """
                     <div class="apartment status {urgent_class}">
-                        <h3>Apartment {apt.get('id', 'N/A')} - Status Updated!</h3>
-                        <p><strong>Status changed: {old_status.title()} → {new_status.title()}</strong></p>
+                        <h3>Apartment {id} - Status Updated!</h3>
+                        <p><strong>Status changed: {old_status_title} → {new_status_title}</strong></p>
                         <div class="details">
                             <div class="detail">
                                 <div class="label">Type:</div>
-                                <div class="value">{apt.get('type', 'N/A')}</div>
+                                <div class="value">{type}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Location:</div>
-                                <div class="value">{apt.get('location', 'N/A')}</div>
+                                <div class="value">{location}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Price:</div>
-                                <div class="value">€{apt.get('price', 'N/A')}/month</div>
+                                <div class="value">€{price}/month</div>
                             </div>
                         </div>
-                        {f'<div style="margin-top: 10px;"><strong>Available from: {apt.get("available_date")}</strong></div>' if apt.get('available_date') else ''}
+                        {available_from}
                         <a href="https://www.apartments-hn.de/en/book-apartment" class="apply-link">Check Now</a>
                     </div>
                 """
-            
-            html_content += "</div>"
-        
-        # Date changes section
-        if date_changes:
-            html_content += f"""
-                <div class="section">
-                    <h2>📅 Date Updates ({len(date_changes)})</h2>
-            """
-            
-            for change in date_changes:
-                apt = change['apartment']
-                old_date = change['old_date'] or 'Not specified'
-                new_date = change['new_date']
-                
-                html_content += f"""
+
+DATE_CHANGE_TEMPLATE = """
                     <div class="apartment date">
-                        <h3>Apartment {apt.get('id', 'N/A')} - Date Updated!</h3>
+                        <h3>Apartment {id} - Date Updated!</h3>
                         <p><strong>Available date: {old_date} → {new_date}</strong></p>
                         <div class="details">
                             <div class="detail">
                                 <div class="label">Type:</div>
-                                <div class="value">{apt.get('type', 'N/A')}</div>
+                                <div class="value">{type}</div>
                             </div>
                             <div class="detail">
                                 <div class="label">Location:</div>
-                                <div class="value">{apt.get('location', 'N/A')}</div>
+                                <div class="value">{location}</div>
                             </div>
                         </div>
                         <a href="https://www.apartments-hn.de/en/book-apartment" class="apply-link">View Details</a>
                     </div>
                 """
+
+AVAILABLE_FROM_TEMPLATE = '<div style="margin-top: 10px;"><strong>Available from: {}</strong></div>'
+BARRIER_FREE_HTML = '<div style="margin-top: 5px; color: #4CAF50;"><strong>✅ Barrier-free accessible</strong></div>'
+
+
+class _NADict(dict):
+    """Apartment fields that read as 'N/A' when missing (dict.get keeps its own default)"""
+    
+    def __missing__(self, key):
+        return 'N/A'
+
+
+def _available_from_html(apt: Dict) -> str:
+    """Render the 'Available from' line, or nothing without a date"""
+    return AVAILABLE_FROM_TEMPLATE.format(apt['available_date']) if apt.get('available_date') else ''
+
+
+class EmailNotifier:
+    """Email notification service for apartment changes"""
+    
+    def __init__(self, config: Dict, logger: logging.Logger):
+        """Initialize notifier with configuration and logger"""
+        self.config = config
+        self.logger = logger
+        self.email_config = config['email']
+        
+        # SMTP session reused across messages, rotated after max_messages_per_connection sends
+        self._smtp = None
+        self._smtp_sent = 0
+        # Guards the session: the service sends from the I/O pool, the event loop and to_thread
+        # workers. Reentrant because the send path closes the session on failure and rotation
+        self._smtp_lock = threading.RLock()
+        self.max_messages_per_connection = self.email_config.get('max_messages_per_connection', 50)
+        atexit.register(self.close)
+        
+        # Changes held back until batch_size have accumulated or the oldest is
+        # batch_max_age_seconds old; the defaults send every batch immediately
+        self._pending_changes = []
+        self._pending_since = None
+        self.batch_size = self.email_config.get('batch_size', 1)
+        self.batch_max_age = self.email_config.get('batch_max_age_seconds', 0)
+
+    def enqueue(self, changes: List[Dict]):
+        """Queue changes for notification, sending the batch once it is due"""
+        if changes:
+            if not self._pending_changes:
+                self._pending_since = time.monotonic()
+            self._pending_changes.extend(changes)
+        
+        if not self._pending_changes:
+            return
+        if (len(self._pending_changes) >= self.batch_size
+                or time.monotonic() - self._pending_since >= self.batch_max_age):
+            self.flush()
+    
+    def has_pending_changes(self) -> bool:
+        """Whether changes are queued but not yet sent"""
+        return bool(self._pending_changes)
+    
+    def flush(self):
+        """Send all queued changes now"""
+        if not self._pending_changes:
+            return
+        changes = self._pending_changes
+        self._pending_changes = []
+        self._pending_since = None
+        self.send_notification(changes)
+
+    def send_notification(self, changes: List[Dict]):
+        """Send email notification about apartment changes"""
+        try:
+            if not changes:
+                self.logger.info("No changes to report, skipping email notification")
+                return
+            
+            if self.email_config.get('per_item_notifications'):
+                # One message per change, all sent over the shared SMTP session
+                for change in changes:
+                    self._send_change_email([change])
+                self.logger.info("Successfully sent %d notification emails", len(changes))
+                return
+            
+            # One digest email covering every change
+            self._send_change_email(changes)
             
-            html_content += "</div>"
+            self.logger.info("Successfully sent notification email for %d changes", len(changes))
+            
+        except Exception as e:
+            self.logger.error("Failed to send notification: %s", e)
+    
+    def _send_change_email(self, changes: List[Dict]):
+        """Send one multipart email (HTML with a plain-text fallback) for the given changes"""
+        subject = f"🏠 SpotEye Alert: {len(changes)} Apartment Updates Available!"
+        html_content = self._create_email_content(changes)
+        text_content = self._create_text_content(changes)
+        self._send_email(subject, html_content, text_content)
+    
+    def _create_text_content(self, changes: List[Dict]) -> str:
+        """Create the plain-text fallback for apartment change emails"""
+        lines = [
+            "SpotEye Apartment Monitor",
+            f"Checked at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            ""
+        ]
         
-        html_content += f"""
-                <div class="footer">
-                    <p>🤖 This message was sent automatically by SpotEye</p>
-                    <p>Monitoring: <a href="https://www.apartments-hn.de/en/book-apartment">W|27 German Student Apartments</a></p>
-                    <p><small>To stop receiving these notifications, please contact your system administrator.</small></p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        for change in changes:
+            view = _NADict(change['apartment'])
+            if change['type'] == 'new':
+                lines.append(f"NEW: Apartment {view['id']} - {view.get('type', 'Unknown')}, "
+                             f"{view['location']}, {view['size']} m², "
+                             f"€{view['price']}/month, {view['availability']}")
+            elif change['type'] == 'status_change':
+                lines.append(f"STATUS: Apartment {view['id']} "
+                             f"{change['old_status']} -> {change['new_status']}")
+            elif change['type'] == 'date_change':
+                lines.append(f"DATE: Apartment {view['id']} "
+                             f"{change['old_date'] or 'Not specified'} -> {change['new_date']}")
+            if view.get('available_date'):
+                lines.append(f"    Available from: {view['available_date']}")
+        
+        lines += ["", "View on website: https://www.apartments-hn.de/en/book-apartment"]
+        return "\n".join(lines)
+    
+    def _create_email_content(self, changes: List[Dict]) -> str:
+        """Create HTML email content for apartment changes"""
+        
+        # Partition changes by type in one pass; unknown types raise KeyError
+        buckets = {'new': [], 'status_change': [], 'date_change': []}
+        for change in changes:
+            buckets[change['type']].append(change)
+        new_apartments, status_changes, date_changes = buckets['new'], buckets['status_change'], buckets['date_change']
+        
+        checked_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        parts = [CHANGE_EMAIL_PRELUDE, CHANGE_EMAIL_HEADER_TEMPLATE.format(checked_at=checked_at)]
+        
+        # New apartments section
+        if new_apartments:
+            parts.append(f"""
+                <div class="section">
+                    <h2>🆕 New Apartments ({len(new_apartments)})</h2>
+            """)
+            
+            for change in new_apartments:
+                apt = change['apartment']
+                fields = _NADict(apt)
+                fields.update(
+                    urgent_class='urgent' if apt.get('availability') in ['available', 'soon'] else '',
+                    type_name=apt.get('type', 'Unknown'),
+                    balcony_title=fields['balcony'].title(),
+                    availability_title=fields['availability'].title(),
+                    available_from=_available_from_html(apt),
+                    barrier_free_note=BARRIER_FREE_HTML if apt.get('barrier_free') else ''
+                )
+                parts.append(NEW_APARTMENT_TEMPLATE.format_map(fields))
+            
+            parts.append("</div>")
+        
+        # Status changes section
+        if status_changes:
+            parts.append(f"""
+                <div class="section">
+                    <h2>📈 Availability Changes ({len(status_changes)})</h2>
+            """)
+            
+            for change in status_changes:
+                apt = change['apartment']
+                old_status = change['old_status']
+                new_status = change['new_status']
+                fields = _NADict(apt)
+                fields.update(
+                    urgent_class='urgent' if new_status in ['available', 'soon'] else '',
+                    old_status_title=old_status.title(),
+                    new_status_title=new_status.title(),
+                    available_from=_available_from_html(apt)
+                )
+                parts.append(STATUS_CHANGE_TEMPLATE.format_map(fields))
+            
+            parts.append("</div>")
+        
+        # Date changes section
+        if date_changes:
+            parts.append(f"""
+                <div class="section">
+                    <h2>📅 Date Updates ({len(date_changes)})</h2>
+            """)
+            
+            for change in date_changes:
+                apt = change['apartment']
+                old_date = change['old_date'] or 'Not specified'
+                new_date = change['new_date']
+                fields = _NADict(apt)
+                fields.update(old_date=old_date, new_date=new_date)
+                parts.append(DATE_CHANGE_TEMPLATE.format_map(fields))
+            
+            parts.append("</div>")
         
-        return html_content
+        parts.append(CHANGE_EMAIL_FOOTER)
+        
+        return "".join(parts)
     
-    def _send_email(self, subject: str, html_content: str):
+    def _send_email(self, subject: str, html_content: str, text_content: Optional[str] = None):
         """Send email using Gmail SMTP"""
         try:
             # Create message
@@ -219,68 +384,110 @@ class EmailNotifier:
             msg['From'] = self.email_config['smtp_user']
             msg['To'] = self.email_config['recipient_email']
             
+            # Add plain-text fallback first; clients prefer the last alternative
+            if text_content:
+                msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+            
             # Add HTML content
             html_part = MIMEText(html_content, 'html', 'utf-8')
             msg.attach(html_part)
             
-            # Connect to Gmail SMTP server
-            server = smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port'])
-            server.starttls()  # Enable encryption
-            server.login(self.email_config['smtp_user'], self.email_config['smtp_password'])
-            
-            # Send email
-            text = msg.as_string()
-            server.sendmail(self.email_config['smtp_user'], self.email_config['recipient_email'], text)
-            server.quit()
+            # Send email over the shared SMTP session, one thread at a time
+            with self._smtp_lock:
+                try:
+                    server = self._get_smtp()
+                    server.send_message(msg)  # Sender and recipients come from the From/To headers
+                    self._smtp_sent += 1
+                except Exception:
+                    # Drop the session so the next message starts from a fresh connection
+                    self.close()
+                    raise
             
             self.logger.info("Email sent successfully")
             
         except Exception as e:
-            self.logger.error(f"Failed to send email: {e}")
+            self.logger.error("Failed to send email: %s", e)
             raise
+    
+    def _get_smtp(self) -> smtplib.SMTP:
+        """Return a live, logged-in SMTP session, reconnecting when needed"""
+        if self._smtp is not None:
+            if self._smtp_sent >= self.max_messages_per_connection:
+                self.logger.debug("SMTP message cap reached, rotating connection")
+                self.close()
+            else:
+                try:
+                    code, _ = self._smtp.noop()
+                except (smtplib.SMTPException, OSError):
+                    code = None
+                if code != 250:
+                    self.logger.debug("SMTP session lost, reconnecting")
+                    self.close()
+        
+        if self._smtp is None:
+            # Connect to Gmail SMTP server
+            server = smtplib.SMTP(self.email_config['smtp_server'], self.email_config['smtp_port'],
+                                  timeout=self.email_config.get('smtp_timeout', 30))
+            server.ehlo()
+            server.starttls()  # Enable encryption
+            server.ehlo()
+            server.login(self.email_config['smtp_user'], self.email_config['smtp_password'])
+            self._smtp = server
+            self._smtp_sent = 0
+        
+        return self._smtp
+    
+    def close(self):
+        """Close the shared SMTP session, if open"""
+        with self._smtp_lock:
+            if self._smtp is None:
+                return
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            finally:
+                self._smtp = None
 
     def send_test_notification(self):
         """Send a test notification to verify email configuration"""
         try:
             subject = "🧪 SpotEye Test Notification"
+            sent_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            html_content = TEST_EMAIL_PRELUDE + TEST_EMAIL_BODY_TEMPLATE.format(sent_at=sent_at)
+            
+            self._send_email(subject, html_content)
+            self.logger.info("Test notification sent successfully")
+            return True
+            
+        except Exception as e:
+            self.logger.error("Failed to send test notification: %s", e)
+            return False 
+
+    def send_failure_alert(self, failure_count: int, error: str):
+        """Alert the recipient that monitoring keeps failing"""
+        try:
+            subject = f"⚠️ SpotEye Alert: Monitoring failed {failure_count} times in a row"
             html_content = f"""
             <!DOCTYPE html>
             <html>
             <head>
                 <meta charset="UTF-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; background-color: #f5f5f5; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background-color: white; padding: 20px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    .header {{ background-color: #4CAF50; color: white; padding: 20px; border-radius: 8px; text-align: center; margin-bottom: 20px; }}
-                    .content {{ text-align: center; padding: 20px; }}
-                    .footer {{ text-align: center; margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }}
-                </style>
             </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>🧪 SpotEye Test</h1>
-                        <p>Email Configuration Test</p>
-                    </div>
-                    <div class="content">
-                        <h2>✅ Email System Working!</h2>
-                        <p>This is a test message to verify that your SpotEye email notification system is properly configured.</p>
-                        <p><strong>Sent at:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                        <p>If you received this message, your email notifications are ready to go!</p>
-                    </div>
-                    <div class="footer">
-                        <p>🤖 SpotEye Apartment Monitor</p>
-                        <p><small>This is an automated test message.</small></p>
-                    </div>
-                </div>
+            <body style="font-family: Arial, sans-serif; margin: 20px;">
+                <h2>⚠️ SpotEye Monitoring Failure</h2>
+                <p>Apartment monitoring has failed <strong>{failure_count}</strong> consecutive times.</p>
+                <p><strong>Last error:</strong> {html.escape(error)}</p>
+                <p><strong>Reported at:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                <p>Checks will keep retrying with increasing delays until the problem is resolved.</p>
             </body>
             </html>
             """
             
             self._send_email(subject, html_content)
-            self.logger.info("Test notification sent successfully")
+            self.logger.info("Failure alert sent successfully")
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to send test notification: {e}")
-            return False 
\ No newline at end of file
+            self.logger.error("Failed to send failure alert: %s", e)
+            return False
@@ -4,22 +4,108 @@ SpotEye Web Scraper Module
 Handles apartment data scraping and parsing from apartments-hn.de
 """
 
+import atexit
+import hashlib
+import json
 import logging
 import os
 import re
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List
 
+import requests
+from lxml import etree
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 
 
+# CSS selectors for apartment listings, most specific first
+APARTMENT_SELECTORS = [
+    'tr[data-apartment]',  # Most specific
+    '.apartment-row',      # Class-based
+    'tbody tr',            # Generic table rows
+    'table tr',            # All table rows
+    '.apartment',          # Generic apartment class
+    '[class*="apartment"]' # Any class containing "apartment"
+]
+
+# Requests blocked in Chrome; stylesheets stay enabled because innerText depends on layout
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm',
+    '*google-analytics*', '*googletagmanager*', '*doubleclick*'
+]
+
+# Rows whose appearance signals that listings are being rendered
+ROW_WAIT_SELECTOR = 'tr[data-apartment], .apartment-row, tbody tr'
+
+# True once any element matching arguments[0] has substantial rendered text
+ROWS_RENDERED_SCRIPT = (
+    "return Array.from(document.querySelectorAll(arguments[0]))"
+    ".some(e => e.innerText.trim().length > 20);"
+)
+
+# Number of elements matching arguments[0], polled until the listing stops growing
+ROW_COUNT_SCRIPT = "return document.querySelectorAll(arguments[0]).length;"
+ROW_STABLE_POLL_SECONDS = 0.2
+ROW_STABLE_TIMEOUT_SECONDS = 2
+
+# JS function for CDP Runtime.evaluate: tries the selector at index `preferred` first, then
+# the rest in priority order, returning [index, texts] for the first one with matches of
+# substantial text (header and empty rows are dropped in the page), or null
+SELECTOR_TEXTS_FUNCTION = (
+    "(preferred => {"
+    " const selectors = " + json.dumps(APARTMENT_SELECTORS) + ";"
+    " const order = [preferred].concat([...selectors.keys()].filter(i => i !== preferred));"
+    " for (const i of order) {"
+    "  const texts = Array.from(document.querySelectorAll(selectors[i]), e => e.innerText.trim())"
+    "   .filter(t => t.length > 20);"
+    "  if (texts.length) return [i, texts];"
+    " }"
+    " return null;"
+    "})"
+)
+
+# Patterns used by _parse_apartment_text
+FLOOR_PATTERN = re.compile(r'(\d+)/\s*(\d+)')
+# Every first-line keyword in one alternation; 'no balcony' precedes 'balcony' so it wins at the same position
+KEYWORD_PATTERN = re.compile(r'Single|Partner|no balcony|balcony|barrier-free|Inner courtyard|Wilhelmstraße|Südstraße')
+LOCATIONS = ('Inner courtyard', 'Wilhelmstraße', 'Südstraße')
+DECIMAL_PATTERN = re.compile(r'\d+\.\d+')
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# Whole first line of a well-formed row, e.g. "3/ 309 Single, balcony Inner courtyard 27.17 520.50";
+# lines it does not match fall back to the individual patterns above
+ROW_PATTERN = re.compile(
+    r'(?P<floor>\d+)/\s*(?P<number>\d+)\s+(?P<type>Single|Partner)'
+    r'(?:,\s*(?P<balcony>no balcony|balcony))?'
+    r'(?:,?\s*(?P<barrier_free>barrier-free))?'
+    r'\s*(?P<location>Inner courtyard|Wilhelmstraße|Südstraße)'
+    r'\s+(?P<size>\d+\.\d+)\s+(?P<price>\d+\.\d+)\s*$'
+)
+
+# XPath equivalents of the Selenium row selectors, most specific first, compiled once
+STATIC_ROW_XPATHS = [
+    etree.XPath('//tr[@data-apartment]'),
+    etree.XPath('//*[contains(concat(" ", normalize-space(@class), " "), " apartment-row ")]'),
+    etree.XPath('//tbody/tr'),
+]
+
+# Elements that start a new line in rendered text; cells are separated by spaces
+LINE_BREAK_TAGS = ('br', 'div', 'p', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+CELL_TAGS = ('td', 'th', 'span', 'a', 'button')
+
+
 class ApartmentScraper:
     """Web scraper for apartment data from apartments-hn.de"""
     
@@ -29,6 +115,27 @@ class ApartmentScraper:
         self.logger = logger
         self.target_url = config['monitoring']['target_url']
         
+        # Persistent HTTP session for the static HTML fast path
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = config['browser']['user_agent']
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Per URL: validators and results of the last successful static fetch
+        self._static_cache = {}
+        self.max_parallel_fetches = config['browser'].get('concurrency', 4)
+        
+        # Index of the selector that last found apartments, tried first on the next page
+        self._selector_index = 0
+        self._static_xpath_index = 0
+        
+        # Chrome driver reused across runs, recreated after driver_max_runs
+        self._driver = None
+        self._driver_runs = 0
+        self.max_driver_runs = config['browser'].get('driver_max_runs', 20)
+        atexit.register(self.close)
+        
     def create_driver(self) -> webdriver.Chrome:
         """Create and configure Chrome WebDriver with stealth options"""
         try:
@@ -40,6 +147,8 @@ class ApartmentScraper:
             chrome_options.add_argument('--disable-dev-shm-usage')
             chrome_options.add_argument('--disable-gpu')
             chrome_options.add_argument('--window-size=1920,1080')
+            # Return from driver.get at DOMContentLoaded; listings are awaited explicitly
+            chrome_options.page_load_strategy = 'eager'
             
             # Stealth options to avoid detection
             chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
@@ -47,7 +156,19 @@ class ApartmentScraper:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
-            # Multiple driver creation strategies
+            # Skip resources that don't affect the listing text
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.default_content_setting_values.notifications': 2
+            })
+            
+            # Record CDP network events so the page's JSON API calls can be identified
+            if self.config['browser'].get('capture_api_responses'):
+                chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            
+            # Multiple driver creation strategies; keep_alive reuses one pooled
+            # HTTP connection to chromedriver for all commands of a session
             driver = None
             
             # Strategy 1: Try manual chromedriver path if configured
@@ -56,7 +177,7 @@ class ApartmentScraper:
                 try:
                     self.logger.info(f"Trying manual ChromeDriver path: {manual_path}")
                     service = webdriver.chrome.service.Service(manual_path)
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
+                    driver = webdriver.Chrome(service=service, options=chrome_options, keep_alive=True)
                     self.logger.info("Successfully created driver with manual path")
                 except Exception as e:
                     self.logger.warning(f"Manual path failed: {e}")
@@ -66,7 +187,7 @@ class ApartmentScraper:
                 try:
                     self.logger.info("Trying webdriver-manager...")
                     service = webdriver.chrome.service.Service(ChromeDriverManager().install())
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
+                    driver = webdriver.Chrome(service=service, options=chrome_options, keep_alive=True)
                     self.logger.info("Successfully created driver with webdriver-manager")
                 except Exception as e:
                     self.logger.warning(f"webdriver-manager failed: {e}")
@@ -75,7 +196,7 @@ class ApartmentScraper:
             if not driver:
                 try:
                     self.logger.info("Trying system PATH...")
-                    driver = webdriver.Chrome(options=chrome_options)
+                    driver = webdriver.Chrome(options=chrome_options, keep_alive=True)
                     self.logger.info("Successfully created driver from system PATH")
                 except Exception as e:
                     self.logger.error(f"All ChromeDriver strategies failed: {e}")
@@ -87,6 +208,8 @@ class ApartmentScraper:
                 driver.execute_cdp_cmd('Network.setUserAgentOverride', {
                     "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
                 })
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
             
             return driver
             
@@ -97,53 +220,241 @@ class ApartmentScraper:
     def scrape_apartments(self) -> List[Dict]:
         """Scrape apartment data from the website"""
         self.logger.info(f"Starting to scrape apartments from {self.target_url}")
+        # One timestamp for every record of this scrape
+        scraped_at = datetime.now().isoformat()
+        
+        # Fast path: plain HTTP fetch, no browser needed if rows are in the HTML
+        apartments = self._scrape_static_html(self.target_url, scraped_at)
+        if apartments:
+            return apartments
+        
+        self.logger.info("No apartments in static HTML, falling back to browser rendering")
+        return self._scrape_with_browser(scraped_at)
+
+    def _scrape_static_html(self, url: str, scraped_at: str) -> List[Dict]:
+        """Fetch the page over HTTP and parse apartment rows without a browser"""
+        cached = self._static_cache.get(url)
+        
+        # Conditional request, only worthwhile when there are results to reuse
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         
-        driver = None
         try:
-            # Create driver
-            driver = self.create_driver()
+            response = self.session.get(url, headers=headers,
+                                        timeout=self.config['monitoring']['timeout'])
+            if response.status_code == 304 and cached:
+                self.logger.info("Page not modified, reusing previous apartment records")
+                return self._restamp(cached['apartments'], scraped_at)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.logger.warning(f"Static HTML fetch failed: {e}")
+            return []
+        
+        body_hash = hashlib.blake2b(response.content, digest_size=16).digest()
+        if cached and body_hash == cached['body_hash']:
+            self.logger.info("Page content unchanged, reusing previous apartment records")
+            return self._restamp(cached['apartments'], scraped_at)
+        
+        tree = lxml_html.fromstring(response.content)
+        
+        # Start from the XPath that matched last time, then the rest in priority order
+        preferred = self._static_xpath_index
+        order = [preferred] + [i for i in range(len(STATIC_ROW_XPATHS)) if i != preferred]
+        for index in order:
+            texts = [self._html_element_text(row) for row in STATIC_ROW_XPATHS[index](tree)]
+            texts = [text for text in texts if len(text) > 20]  # Ensure substantial content
+            if not texts:
+                continue
+            apartments = [self._parse_apartment_text(text, scraped_at) for text in texts]
+            # Only trust rows that parsed as listings; unrelated tables must not stand in for them
+            if any(apt['id'] for apt in apartments):
+                self._static_xpath_index = index
+                self.logger.info(f"Extracted {len(apartments)} apartment records from static HTML")
+                
+                self._static_cache[url] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'body_hash': body_hash,
+                    'apartments': apartments
+                }
+                return list(apartments)
+        
+        return []
+
+    @staticmethod
+    def _restamp(apartments: List[Dict], scraped_at: str) -> List[Dict]:
+        """Copy reused apartment records with the current scrape time"""
+        return [{**apt, 'scraped_at': scraped_at} for apt in apartments]
+
+    @staticmethod
+    def _html_element_text(element) -> str:
+        """Approximate the browser's rendered text of an lxml element"""
+        for child in element.iter(*LINE_BREAK_TAGS):
+            child.text = '\n' + (child.text or '')
+            child.tail = '\n' + (child.tail or '')
+        for child in element.iter(*CELL_TAGS):
+            child.tail = ' ' + (child.tail or '')
+        
+        lines = (' '.join(line.split()) for line in element.text_content().split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    def _get_or_create_driver(self) -> webdriver.Chrome:
+        """Return the cached Chrome driver, creating a new one if needed"""
+        if self._driver is not None:
+            if self._driver_runs >= self.max_driver_runs:
+                self.logger.info(f"Recycling Chrome driver after {self._driver_runs} runs")
+                self.close()
+            else:
+                try:
+                    # Reset state left over from the previous run; also a cheap health check
+                    self._driver.delete_all_cookies()
+                except WebDriverException as e:
+                    self.logger.warning(f"Cached Chrome driver is unusable, recreating: {e}")
+                    self.close()
+        
+        if self._driver is None:
+            self._driver = self.create_driver()
+            self._driver_runs = 0
+        
+        self._driver_runs += 1
+        return self._driver
+
+    def __enter__(self) -> 'ApartmentScraper':
+        """Use the scraper as a context manager that quits the driver on exit"""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Quit the cached Chrome driver"""
+        self.close()
+
+    def close(self):
+        """Quit the cached Chrome driver, if any"""
+        if self._driver is None:
+            return
+        
+        try:
+            self._driver.quit()
+            self.logger.debug("Chrome driver closed")
+        except Exception as e:
+            self.logger.debug(f"Error closing Chrome driver: {e}")
+        finally:
+            self._driver = None
+
+    def _scrape_with_browser(self, scraped_at: str) -> List[Dict]:
+        """Scrape apartment data by rendering the page in Chrome"""
+        try:
+            # Reuse the driver from previous runs where possible
+            driver = self._get_or_create_driver()
             
-            # Navigate to target URL
-            driver.get(self.target_url)
+            # Navigate only when the tab isn't already on the target, otherwise reload it
+            if driver.current_url == self.target_url:
+                driver.refresh()
+            else:
+                driver.get(self.target_url)
             self.logger.info("Successfully loaded the page")
             
-            # Wait for dynamic content to load
-            self._wait_for_content_load(driver)
+            apartments = self._extract_apartments(driver, scraped_at)
+            self.logger.info(f"Successfully extracted {len(apartments)} apartment records")
+            return apartments
+            
+        except Exception as e:
+            self.logger.error(f"Error during scraping: {e}")
+            # Don't reuse a driver that may be left in a broken state
+            self.close()
+            raise
+
+    def scrape_all(self, urls: List[str]) -> List[Dict]:
+        """Scrape several pages, fetching them in parallel and rendering only where needed"""
+        self.logger.info(f"Starting to scrape apartments from {len(urls)} pages")
+        # One timestamp for every record of this scrape
+        scraped_at = datetime.now().isoformat()
+        
+        # Fetch every page over HTTP concurrently; only pages without static rows need the browser
+        with ThreadPoolExecutor(max_workers=min(len(urls), self.max_parallel_fetches)) as pool:
+            static_results = list(pool.map(lambda url: self._scrape_static_html(url, scraped_at), urls))
+        
+        browser_urls = [url for url, page_apartments in zip(urls, static_results) if not page_apartments]
+        rendered = self._scrape_in_tabs(browser_urls, scraped_at) if browser_urls else {}
+        
+        apartments = []
+        for url, page_apartments in zip(urls, static_results):
+            apartments.extend(page_apartments or rendered[url])
+        
+        self.logger.info(f"Successfully extracted {len(apartments)} apartment records")
+        return apartments
+
+    def _scrape_in_tabs(self, urls: List[str], scraped_at: str) -> Dict[str, List[Dict]]:
+        """Render several pages with one browser, loading each page in its own tab"""
+        try:
+            driver = self._get_or_create_driver()
+            main_handle = driver.current_window_handle
+            
+            # Start every page load before waiting for any page's content
+            driver.get(urls[0])
+            handles = [main_handle]
+            for url in urls[1:]:
+                driver.switch_to.new_window('tab')
+                driver.get(url)
+                handles.append(driver.current_window_handle)
             
-            # Find apartment elements
-            apartment_elements = self._find_apartment_elements(driver)
-            self.logger.info(f"Found {len(apartment_elements)} apartment elements")
+            apartments_by_url = {}
+            for url, handle in zip(urls, handles):
+                driver.switch_to.window(handle)
+                page_apartments = self._extract_apartments(driver, scraped_at)
+                self.logger.info(f"Extracted {len(page_apartments)} apartment records from {url}")
+                apartments_by_url[url] = page_apartments
             
-            # Extract data from each element
-            apartments = []
-            for i, element in enumerate(apartment_elements, 1):
-                apartment_data = self._extract_apartment_data(element)
-                if apartment_data:
-                    apartments.append(apartment_data)
-                    self.logger.debug(f"Extracted apartment {i}: {apartment_data.get('id', 'Unknown')}")
+            # Close the extra tabs, keeping the first one for the next run
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(main_handle)
             
-            self.logger.info(f"Successfully extracted {len(apartments)} apartment records")
-            return apartments
+            return apartments_by_url
             
         except Exception as e:
             self.logger.error(f"Error during scraping: {e}")
+            # Don't reuse a driver that may be left in a broken state
+            self.close()
             raise
+
+    def _extract_apartments(self, driver, scraped_at: str) -> List[Dict]:
+        """Wait for the current page's listings and parse them into apartment records"""
+        # Wait for dynamic content to load
+        self._wait_for_content_load(driver)
         
-        finally:
-            if driver:
-                driver.quit()
-                self.logger.debug("Chrome driver closed")
+        # Fetch the text of all apartment elements in one round-trip
+        apartment_texts = self._find_apartment_texts(driver)
+        self.logger.info(f"Found {len(apartment_texts)} apartment elements")
+        
+        if self.config['browser'].get('capture_api_responses'):
+            self._log_api_responses(driver)
+        
+        # Parse each apartment's text, checking the log level once rather than per row
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        apartments = []
+        for i, text_content in enumerate(apartment_texts, 1):
+            apartment_data = self._parse_apartment_text(text_content, scraped_at)
+            apartments.append(apartment_data)
+            if debug_enabled:
+                self.logger.debug(f"Extracted apartment {i}: {apartment_data.get('id', 'Unknown')}")
+        
+        return apartments
 
     def _wait_for_content_load(self, driver):
         """Wait for dynamic content to load on the page"""
         try:
             # Wait for "Loading data..." to disappear or content to appear
-            wait = WebDriverWait(driver, 30)
+            wait = WebDriverWait(driver, self.config['monitoring']['timeout'])
             
             # Try multiple strategies to detect when content is loaded
             try:
                 # Strategy 1: Wait for apartment rows to appear
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'tr[data-apartment], .apartment-row, tbody tr')))
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ROW_WAIT_SELECTOR)))
                 self.logger.info("Apartment elements detected")
             except TimeoutException:
                 # Strategy 2: Wait for any table content
@@ -153,154 +464,179 @@ class ApartmentScraper:
                 except TimeoutException:
                     self.logger.warning("Timeout waiting for content, proceeding anyway")
             
-            # Additional wait to ensure JavaScript rendering is complete
-            time.sleep(3)
-            
-        except Exception as e:
-            self.logger.warning(f"Error waiting for content load: {e}")
-
-    def _find_apartment_elements(self, driver):
-        """Find apartment listing elements using multiple CSS selectors"""
-        apartment_elements = []
-        
-        # Multiple selector strategies
-        selectors = [
-            'tr[data-apartment]',  # Most specific
-            '.apartment-row',      # Class-based
-            'tbody tr',            # Generic table rows
-            'table tr',            # All table rows
-            '.apartment',          # Generic apartment class
-            '[class*="apartment"]' # Any class containing "apartment"
-        ]
-        
-        for selector in selectors:
+            # Wait until rows carry rendered text rather than sleeping a fixed time
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    # Filter out header rows or empty elements
-                    valid_elements = []
-                    for element in elements:
-                        text_content = element.text.strip()
-                        if text_content and len(text_content) > 20:  # Ensure substantial content
-                            valid_elements.append(element)
-                    
-                    if valid_elements:
-                        apartment_elements = valid_elements
-                        self.logger.info(f"Found {len(apartment_elements)} apartments using selector: {selector}")
-                        break
-                        
-            except NoSuchElementException:
-                continue
-        
-        if not apartment_elements:
-            self.logger.warning("No apartment elements found with any selector")
-        
-        return apartment_elements
-
-    def _extract_apartment_data(self, element) -> Optional[Dict]:
-        """Extract apartment data from a single element"""
-        try:
-            text_content = element.text.strip()
-            
-            if not text_content:
-                return None
+                WebDriverWait(driver, self.config['monitoring']['wait_for_data']).until(
+                    lambda d: d.execute_script(ROWS_RENDERED_SCRIPT, ROW_WAIT_SELECTOR)
+                )
+            except TimeoutException:
+                self.logger.warning("Timeout waiting for rendered apartment rows, proceeding anyway")
             
-            # Parse the apartment information from the text
-            apartment_data = self._parse_apartment_text(text_content)
+            # Rows may still be streaming in; return once two consecutive counts agree
+            row_counts = []
             
-            # Log the raw content for analysis
-            self.logger.debug(f"Extracted apartment text: {text_content[:100]}...")
+            def rows_stable(d):
+                row_counts.append(d.execute_script(ROW_COUNT_SCRIPT, ROW_WAIT_SELECTOR))
+                return len(row_counts) > 1 and row_counts[-1] == row_counts[-2]
             
-            return apartment_data
+            try:
+                WebDriverWait(driver, ROW_STABLE_TIMEOUT_SECONDS,
+                              poll_frequency=ROW_STABLE_POLL_SECONDS).until(rows_stable)
+            except TimeoutException:
+                self.logger.debug("Row count still changing after %ss, proceeding", ROW_STABLE_TIMEOUT_SECONDS)
             
         except Exception as e:
-            self.logger.error(f"Error extracting apartment data: {e}")
-            return None
-    
-    def _parse_apartment_text(self, text: str) -> Dict:
-        """Parse apartment text into structured data"""
-        apartment_data = {
-            'id': None,
-            'floor': None,
-            'apartment_number': None,
-            'type': None,
-            'balcony': None,
-            'location': None,
-            'size': None,
-            'price': None,
-            'availability': None,
-            'available_date': None,
-            'barrier_free': False,
-            'raw_text': text,
-            'scraped_at': datetime.now().isoformat()
-        }
-        
-        # Split text into lines
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        if not lines:
-            return apartment_data
-        
-        # Parse first line: "Floor/ ApartmentNumber Type, balcony Location Size Price"
-        # Example: "3/ 309 Single, balcony Inner courtyard 27.17 520.50"
-        first_line = lines[0]
-        
-        # Extract floor and apartment number
-        floor_match = re.match(r'(\d+)/\s*(\d+)', first_line)
-        if floor_match:
-            apartment_data['floor'] = floor_match.group(1)
-            apartment_data['apartment_number'] = floor_match.group(2)
-            apartment_data['id'] = f"{apartment_data['floor']}-{apartment_data['apartment_number']}"
-        
-        # Extract type (Single, Partner)
-        if 'Single' in first_line:
-            apartment_data['type'] = 'Single'
-        elif 'Partner' in first_line:
-            apartment_data['type'] = 'Partner'
+            self.logger.warning(f"Error waiting for content load: {e}")
+
+    def _log_api_responses(self, driver):
+        """Log the JSON XHR/fetch responses the page loaded, from the CDP performance log"""
+        try:
+            entries = driver.get_log('performance')
+        except WebDriverException as e:
+            self.logger.warning(f"Could not read the performance log: {e}")
+            return
         
-        # Extract balcony information
-        if 'no balcony' in first_line:
-            apartment_data['balcony'] = 'no'
-        elif 'balcony' in first_line:
-            apartment_data['balcony'] = 'yes'
-            
-        # Check for barrier-free
-        if 'barrier-free' in first_line:
-            apartment_data['barrier_free'] = True
+        for entry in entries:
+            message = json.loads(entry['message'])['message']
+            if message.get('method') != 'Network.responseReceived':
+                continue
+            params = message['params']
+            response = params['response']
+            if params.get('type') in ('XHR', 'Fetch') and 'json' in response.get('mimeType', ''):
+                self.logger.info(f"Page loaded JSON API response: {response['url']} ({response.get('status')})")
+
+    def _find_apartment_texts(self, driver) -> List[str]:
+        """Find apartment listings using multiple CSS selectors and return their text"""
+        apartment_texts = []
         
-        # Extract location (Inner courtyard, Wilhelmstraße, Südstraße)
-        location_patterns = [
-            r'Inner courtyard',
-            r'Wilhelmstraße',
-            r'Südstraße'
-        ]
-        for pattern in location_patterns:
-            if re.search(pattern, first_line):
-                apartment_data['location'] = pattern.replace('ß', 'ss')  # Normalize
-                break
+        # A single CDP evaluation runs the selector fallback chain inside the page,
+        # starting from the selector that worked last time
+        result = driver.execute_cdp_cmd('Runtime.evaluate', {
+            'expression': f"{SELECTOR_TEXTS_FUNCTION}({self._selector_index})",
+            'returnByValue': True
+        })
+        match = result.get('result', {}).get('value')
         
-        # Extract size and price (last two numbers in the first line)
-        numbers = re.findall(r'\d+\.\d+', first_line)
-        if len(numbers) >= 2:
-            apartment_data['size'] = float(numbers[-2])  # Second to last number (size in m²)
-            apartment_data['price'] = float(numbers[-1])  # Last number (price in euros)
+        if match:
+            index, apartment_texts = match
+            self._selector_index = index
+            self.logger.info(f"Found {len(apartment_texts)} apartments using selector: {APARTMENT_SELECTORS[index]}")
         
-        # Parse availability status
-        if len(lines) > 1:
-            status_line = lines[1]
-            if 'Already taken' in status_line:
-                apartment_data['availability'] = 'taken'
-            elif 'Soon available' in status_line:
-                apartment_data['availability'] = 'soon'
-                # Extract available date if present
-                if len(lines) > 2:
-                    date_line = lines[2]
-                    date_match = re.match(r'(\d{4}-\d{2}-\d{2})', date_line)
-                    if date_match:
-                        apartment_data['available_date'] = date_match.group(1)
-            elif 'Apply now' in status_line:
-                apartment_data['availability'] = 'available'
-            else:
-                apartment_data['availability'] = 'unknown'
+        if not apartment_texts:
+            self.logger.warning("No apartment elements found with any selector")
         
-        return apartment_data 
\ No newline at end of file
+        return apartment_texts
+
+    def _parse_apartment_text(self, text: str, scraped_at: str) -> Dict:
+        """Parse apartment text into a fresh record stamped with the given scrape time"""
+        return {**parse_apartment_text(text), 'scraped_at': scraped_at}
+
+
+@lru_cache(maxsize=4096)  # Room for several monitored pages plus rows that changed recently
+def parse_apartment_text(text: str) -> Dict:
+    """Parse apartment text into structured data (cached; callers must not mutate the result)"""
+    apartment_data = {
+        'id': None,
+        'floor': None,
+        'apartment_number': None,
+        'type': None,
+        'balcony': None,
+        'location': None,
+        'size': None,
+        'price': None,
+        'availability': None,
+        'available_date': None,
+        'barrier_free': False,
+        'raw_text': text
+    }
+    
+    # Split text into lines
+    lines = [line for line in map(str.strip, text.split('\n')) if line]
+    
+    if not lines:
+        return apartment_data
+    
+    # Parse first line: "Floor/ ApartmentNumber Type, balcony Location Size Price"
+    # Example: "3/ 309 Single, balcony Inner courtyard 27.17 520.50"
+    first_line = lines[0]
+    
+    # Fast path: a single match yields every field of a well-formed line
+    row_match = ROW_PATTERN.match(first_line)
+    if row_match:
+        apartment_data['floor'] = row_match['floor']
+        apartment_data['apartment_number'] = row_match['number']
+        apartment_data['id'] = f"{row_match['floor']}-{row_match['number']}"
+        apartment_data['type'] = row_match['type']
+        if row_match['balcony']:
+            apartment_data['balcony'] = 'no' if row_match['balcony'] == 'no balcony' else 'yes'
+        apartment_data['barrier_free'] = row_match['barrier_free'] is not None
+        apartment_data['location'] = row_match['location'].replace('ß', 'ss')  # Normalize
+        apartment_data['size'] = float(row_match['size'])
+        apartment_data['price'] = float(row_match['price'])
+    else:
+        _parse_first_line_fields(first_line, apartment_data)
+    
+    # Parse availability status
+    if len(lines) > 1:
+        status_line = lines[1]
+        if 'Already taken' in status_line:
+            apartment_data['availability'] = 'taken'
+        elif 'Soon available' in status_line:
+            apartment_data['availability'] = 'soon'
+            # Extract available date if present
+            if len(lines) > 2:
+                date_line = lines[2]
+                date_match = DATE_PATTERN.match(date_line)
+                if date_match:
+                    apartment_data['available_date'] = date_match.group(1)
+        elif 'Apply now' in status_line:
+            apartment_data['availability'] = 'available'
+        else:
+            apartment_data['availability'] = 'unknown'
+    
+    return apartment_data
+
+
+def _parse_first_line_fields(first_line: str, apartment_data: Dict):
+    """Fill first-line fields with individual scans, for lines ROW_PATTERN does not match"""
+    # Extract floor and apartment number
+    floor_match = FLOOR_PATTERN.match(first_line)
+    if floor_match:
+        apartment_data['floor'] = floor_match.group(1)
+        apartment_data['apartment_number'] = floor_match.group(2)
+        apartment_data['id'] = f"{apartment_data['floor']}-{apartment_data['apartment_number']}"
+    
+    # Collect type, balcony, barrier-free and location keywords in a single scan
+    keywords = set()
+    location = None
+    for keyword_match in KEYWORD_PATTERN.finditer(first_line):
+        keyword = keyword_match.group(0)
+        keywords.add(keyword)
+        if location is None and keyword in LOCATIONS:
+            location = keyword
+    
+    # Extract type (Single, Partner)
+    if 'Single' in keywords:
+        apartment_data['type'] = 'Single'
+    elif 'Partner' in keywords:
+        apartment_data['type'] = 'Partner'
+    
+    # Extract balcony information
+    if 'no balcony' in keywords:
+        apartment_data['balcony'] = 'no'
+    elif 'balcony' in keywords:
+        apartment_data['balcony'] = 'yes'
+    
+    # Check for barrier-free
+    if 'barrier-free' in keywords:
+        apartment_data['barrier_free'] = True
+    
+    # Extract location (Inner courtyard, Wilhelmstraße, Südstraße)
+    if location:
+        apartment_data['location'] = location.replace('ß', 'ss')  # Normalize
+    
+    # Extract size and price (last two numbers in the first line)
+    numbers = DECIMAL_PATTERN.findall(first_line)
+    if len(numbers) >= 2:
+        apartment_data['size'] = float(numbers[-2])  # Second to last number (size in m²)
+        apartment_data['price'] = float(numbers[-1])  # Last number (price in euros)
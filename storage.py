@@ -4,11 +4,59 @@ SpotEye Data Storage Module
 Handles apartment data storage, loading, and change detection
 """
 
-import json
+import asyncio
 import logging
+import mmap
 import os
+import sqlite3
+import threading
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+import orjson
+
+# Availability statuses worth reporting to the user
+SOON_AVAILABLE_STATUSES = frozenset(('soon', 'available'))
+
+# Database key prefix for rows stored without an apartment id
+UNKEYED_ROW_PREFIX = 'row:'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apartments (
+    id TEXT PRIMARY KEY,
+    availability TEXT,
+    available_date TEXT,
+    updated_at TEXT,
+    raw_text TEXT,
+    position INTEGER,
+    data BLOB
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Rows whose listing text, position and tracked fields are unchanged are left untouched,
+# so a check only writes the apartments that actually changed. The data blob therefore omits
+# scraped_at; the latest scrape time is kept in meta and stamped onto records when loading
+UPSERT_APARTMENT_SQL = """
+INSERT INTO apartments (id, availability, available_date, updated_at, raw_text, position, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    availability = excluded.availability,
+    available_date = excluded.available_date,
+    updated_at = excluded.updated_at,
+    raw_text = excluded.raw_text,
+    position = excluded.position,
+    data = excluded.data
+WHERE excluded.raw_text IS NULL
+    OR apartments.raw_text IS NOT excluded.raw_text
+    OR apartments.position IS NOT excluded.position
+    OR apartments.availability IS NOT excluded.availability
+    OR apartments.available_date IS NOT excluded.available_date
+"""
 
 
 class ApartmentStorage:
@@ -18,48 +66,183 @@ class ApartmentStorage:
         """Initialize storage with configuration and logger"""
         self.config = config
         self.logger = logger
-        self.data_file = config['data_storage']['file_path']
+        self.db_path = config['data_storage']['db_path']
+        self.legacy_file = config['data_storage']['file_path']
+        
+        # One connection per storage, shared by the event loop's worker threads
+        self._db_lock = threading.Lock()
+        self._db_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db_conn.execute('PRAGMA journal_mode=WAL')
+        self._db_conn.execute('PRAGMA synchronous=NORMAL')
+        # Truncate the write-ahead log back to 1 MB after checkpoints
+        self._db_conn.execute('PRAGMA journal_size_limit=1048576')
+        self._db_conn.executescript(SCHEMA)
+        
+        # Loaded data, reused until another connection commits or we save
+        self._cached_data = None
+        self._cached_data_version = None
+        
+        self._import_legacy_file()
+    
+    def _import_legacy_file(self):
+        """Import the old JSON data file once, if the database is still empty"""
+        if not os.path.exists(self.legacy_file):
+            return
+        with self._db_lock:
+            if self._db_conn.execute('SELECT 1 FROM meta LIMIT 1').fetchone():
+                return
+        try:
+            with open(self.legacy_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = orjson.loads(memoryview(mapped))
+            self.save_data(data)
+            self.logger.info(f"Imported legacy data file {self.legacy_file} into {self.db_path}")
+        except Exception as e:
+            self.logger.error(f"Error importing legacy data file: {e}")
 
     def load_historical_data(self) -> Dict:
-        """Load historical data from file"""
+        """Load historical data from the database, reusing the loaded copy if nothing was written"""
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.logger.info(f"Loaded historical data with {len(data.get('apartments', []))} apartments")
-                    return data
+            with self._db_lock:
+                # data_version only changes when another connection commits
+                data_version = self._db_conn.execute('PRAGMA data_version').fetchone()[0]
+                if self._cached_data is not None and data_version == self._cached_data_version:
+                    self.logger.debug("Historical data unchanged, using cached copy")
+                    return self._cached_data
+                
+                meta = dict(self._db_conn.execute('SELECT key, value FROM meta'))
+                rows = self._db_conn.execute('SELECT data FROM apartments ORDER BY position').fetchall()
+                # Splice the stored JSON objects into one array and decode it in a single call
+                apartments = orjson.loads(b'[' + b','.join(data for (data,) in rows) + b']')
+                scraped_at = meta.get('scraped_at') or meta.get('last_check')
+                if scraped_at:
+                    for apt in apartments:
+                        apt['scraped_at'] = scraped_at
+                
+                data = {
+                    'last_check': meta.get('last_check'),
+                    'apartments': apartments,
+                    'total_apartments': len(apartments),
+                    'last_update': meta.get('last_update')
+                }
+                self._cached_data = data
+                self._cached_data_version = data_version
+            
+            if data['last_check'] is None:
+                self.logger.info("No historical data found, starting fresh")
             else:
-                self.logger.info("No historical data file found, starting fresh")
-                return {'apartments': [], 'last_check': None}
+                self.logger.info(f"Loaded historical data with {len(apartments)} apartments")
+            return data
         except Exception as e:
             self.logger.error(f"Error loading historical data: {e}")
             return {'apartments': [], 'last_check': None}
     
+    async def aload_historical_data(self) -> Dict:
+        """Async variant of load_historical_data for use inside the event loop"""
+        return await asyncio.to_thread(self.load_historical_data)
+    
     def save_data(self, data: Dict):
-        """Save data to file"""
+        """Write changed apartments in one transaction and drop ones no longer listed
+        
+        Rows without an id are kept, like the JSON file kept them, under a key derived from their
+        position; change detection still ignores them since their records carry no id.
+        """
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            self.logger.info(f"Saved {len(data.get('apartments', []))} apartments to {self.data_file}")
+            last_check = data.get('last_check') or datetime.now().isoformat()
+            apartments = data.get('apartments', [])
+            rows = [
+                (apt.get('id') or f"{UNKEYED_ROW_PREFIX}{position}",
+                 apt.get('availability'), apt.get('available_date'),
+                 apt.get('scraped_at') or last_check, apt.get('raw_text'), position,
+                 orjson.dumps({key: value for key, value in apt.items() if key != 'scraped_at'}))
+                for position, apt in enumerate(apartments)
+            ]
+            last_update = data.get('last_update') or last_check
+            scraped_at = max((apt['scraped_at'] for apt in apartments if apt.get('scraped_at')),
+                             default=last_check)
+            meta = [('last_check', last_check), ('last_update', last_update), ('scraped_at', scraped_at)]
+            
+            with self._db_lock, self._db_conn:
+                self._db_conn.executemany(UPSERT_APARTMENT_SQL, rows)
+                current_ids = {row[0] for row in rows}
+                removed = [(apt_id,) for (apt_id,) in self._db_conn.execute('SELECT id FROM apartments')
+                           if apt_id not in current_ids]
+                self._db_conn.executemany('DELETE FROM apartments WHERE id = ?', removed)
+                self._db_conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', meta)
+            
+            # Keep the saved records, stamped as a load would stamp them, as the cached copy instead
+            # of decoding them back on the next load; our own commits do not bump data_version
+            with self._db_lock:
+                self._cached_data = {
+                    'last_check': last_check,
+                    'apartments': [{**apt, 'scraped_at': scraped_at} for apt in apartments],
+                    'total_apartments': len(apartments),
+                    'last_update': last_update
+                }
+                self._cached_data_version = self._db_conn.execute('PRAGMA data_version').fetchone()[0]
+            
+            self.logger.info(f"Saved {len(rows)} apartments to {self.db_path}")
         except Exception as e:
             self.logger.error(f"Error saving data: {e}")
     
+    def close(self):
+        """Close the database connection"""
+        with self._db_lock:
+            self._db_conn.close()
+    
+    def load_tracked_fields(self) -> Dict[str, Tuple]:
+        """Load (availability, available_date) per stored apartment id, without decoding the records"""
+        try:
+            with self._db_lock:
+                return {
+                    apt_id: (availability, available_date)
+                    for apt_id, availability, available_date in self._db_conn.execute(
+                        'SELECT id, availability, available_date FROM apartments'
+                    )
+                }
+        except Exception as e:
+            self.logger.error(f"Error loading stored apartment fields: {e}")
+            return {}
+    
+    def detect_stored_changes(self, current_data: List[Dict]) -> List[Dict]:
+        """Detect changes between current data and the apartments stored in the database"""
+        historical_index = self.load_tracked_fields()
+        return self._detect_changes(current_data, historical_index, bool(historical_index))
+    
     def detect_changes(self, current_data: List[Dict], historical_data: Dict) -> List[Dict]:
         """Detect changes between current and historical data"""
         historical_apartments = historical_data.get('apartments', [])
         
-        # Create dictionaries for easy lookup
-        historical_dict = {apt.get('id'): apt for apt in historical_apartments if apt.get('id')}
-        current_dict = {apt.get('id'): apt for apt in current_data if apt.get('id')}
+        # Hash join on id: one (availability, available_date) entry per historical apartment,
+        # probed once per current apartment; unchanged apartments are skipped immediately
+        historical_index = {
+            apt_id: (apt.get('availability'), apt.get('available_date'))
+            for apt in historical_apartments if (apt_id := apt.get('id'))
+        }
+        return self._detect_changes(current_data, historical_index, bool(historical_apartments))
+    
+    def _detect_changes(self, current_data: List[Dict], historical_index: Dict[str, Tuple],
+                        has_history: bool) -> List[Dict]:
+        """Compare current apartments against (availability, available_date) per historical id"""
+        lookup_historical = historical_index.get
         
         new_apartments = []
         changed_apartments = []
         
-        for apt_id, current_apt in current_dict.items():
-            if apt_id not in historical_dict:
+        # One entry per id, in listing order; overlapping pages can list the same apartment twice
+        current_by_id = {apt_id: apt for apt in current_data if (apt_id := apt.get('id'))}
+        
+        for apt_id, current_apt in current_by_id.items():
+            # Compare the tracked fields as one tuple; unchanged apartments stop here
+            current = (current_apt.get('availability'), current_apt.get('available_date'))
+            historical = lookup_historical(apt_id)
+            if historical == current:
+                continue
+            current_status, current_date = current
+            
+            if historical is None:
                 # Only treat as "new" if it's actually interesting (available/soon)
                 # Skip if it's just a "taken" apartment on first run
-                if current_apt.get('availability') in ['available', 'soon'] or len(historical_apartments) > 0:
+                if current_status in SOON_AVAILABLE_STATUSES or has_history:
                     new_apartments.append({
                         'type': 'new',
                         'apartment': current_apt
@@ -67,37 +250,29 @@ class ApartmentStorage:
                     self.logger.info(f"New apartment found: {apt_id}")
                 else:
                     self.logger.debug(f"Skipping taken apartment on initial load: {apt_id}")
-                
-            else:
-                # Check if availability status changed
-                historical_apt = historical_dict[apt_id]
-                historical_status = historical_apt.get('availability')
-                current_status = current_apt.get('availability')
-                
-                if historical_status != current_status:
-                    # Status changed
-                    if current_status in ['soon', 'available'] and historical_status == 'taken':
-                        # Changed from taken to available - this is important!
-                        changed_apartments.append({
-                            'type': 'status_change',
-                            'apartment': current_apt,
-                            'old_status': historical_status,
-                            'new_status': current_status
-                        })
-                        self.logger.info(f"Status change: {apt_id} from {historical_status} to {current_status}")
-                    
-                # Check if available date changed
-                historical_date = historical_apt.get('available_date')
-                current_date = current_apt.get('available_date')
-                
-                if historical_date != current_date and current_date:
-                    changed_apartments.append({
-                        'type': 'date_change',
-                        'apartment': current_apt,
-                        'old_date': historical_date,
-                        'new_date': current_date
-                    })
-                    self.logger.info(f"Date change: {apt_id} from {historical_date} to {current_date}")
+                continue
+            
+            historical_status, historical_date = historical
+            
+            # Check if availability status changed from taken to available - this is important!
+            if current_status != historical_status and current_status in SOON_AVAILABLE_STATUSES and historical_status == 'taken':
+                changed_apartments.append({
+                    'type': 'status_change',
+                    'apartment': current_apt,
+                    'old_status': historical_status,
+                    'new_status': current_status
+                })
+                self.logger.info(f"Status change: {apt_id} from {historical_status} to {current_status}")
+            
+            # Check if available date changed
+            if historical_date != current_date and current_date:
+                changed_apartments.append({
+                    'type': 'date_change',
+                    'apartment': current_apt,
+                    'old_date': historical_date,
+                    'new_date': current_date
+                })
+                self.logger.info(f"Date change: {apt_id} from {historical_date} to {current_date}")
         
         all_changes = new_apartments + changed_apartments
         
@@ -110,11 +285,12 @@ class ApartmentStorage:
 
     def create_updated_data(self, current_apartments: List[Dict]) -> Dict:
         """Create updated data structure for saving"""
+        now = datetime.now().isoformat()
         return {
-            'last_check': datetime.now().isoformat(),
+            'last_check': now,
             'apartments': current_apartments,
             'total_apartments': len(current_apartments),
-            'last_update': datetime.now().isoformat()
+            'last_update': now
         }
 
     def get_statistics(self, apartments: List[Dict]) -> Dict:
@@ -125,34 +301,28 @@ class ApartmentStorage:
                 'by_status': {},
                 'by_type': {},
                 'by_location': {},
-                'price_stats': {}
+                'price_stats': {},
+                'soon_available': []
             }
         
+        # Pull each field out as a column, then count and reduce the columns in C
+        statuses = [apt.get('availability', 'unknown') for apt in apartments]
+        status_counts = Counter(statuses)
+        type_counts = Counter([apt.get('type', 'unknown') for apt in apartments])
+        location_counts = Counter([apt.get('location', 'unknown') for apt in apartments])
+        soon_available = [apt for apt, status in zip(apartments, statuses) if status in SOON_AVAILABLE_STATUSES]
+        prices = [price for apt in apartments if (price := apt.get('price'))]
+        
         stats = {
             'total': len(apartments),
-            'by_status': {},
-            'by_type': {},
-            'by_location': {},
-            'price_stats': {}
+            'by_status': dict(status_counts),
+            'by_type': dict(type_counts),
+            'by_location': dict(location_counts),
+            'price_stats': {},
+            'soon_available': soon_available
         }
         
-        # Count by status
-        for apt in apartments:
-            status = apt.get('availability', 'unknown')
-            stats['by_status'][status] = stats['by_status'].get(status, 0) + 1
-        
-        # Count by type
-        for apt in apartments:
-            apt_type = apt.get('type', 'unknown')
-            stats['by_type'][apt_type] = stats['by_type'].get(apt_type, 0) + 1
-        
-        # Count by location
-        for apt in apartments:
-            location = apt.get('location', 'unknown')
-            stats['by_location'][location] = stats['by_location'].get(location, 0) + 1
-        
         # Price statistics
-        prices = [apt.get('price') for apt in apartments if apt.get('price')]
         if prices:
             stats['price_stats'] = {
                 'min': min(prices),
@@ -3,22 +3,26 @@
 Simple data viewer for SpotEye apartment data
 """
 
-import json
+import logging
 import os
-from datetime import datetime
+from collections import defaultdict
+
+from config import get_config
+from storage import ApartmentStorage
 
 
 def view_current_data():
     """Display current apartment data in detail"""
-    data_file = 'apartment_data.json'
+    config = get_config()
     
-    if not os.path.exists(data_file):
+    if not os.path.exists(config['data_storage']['db_path']) and not os.path.exists(config['data_storage']['file_path']):
         print("❌ No data file found. Run monitoring first.")
         return
     
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        storage = ApartmentStorage(config, logging.getLogger(__name__))
+        data = storage.load_historical_data()
+        storage.close()
         
         apartments = data.get('apartments', [])
         last_check = data.get('last_check', 'Unknown')
@@ -34,13 +38,19 @@ def view_current_data():
             print("❌ No apartment data available.")
             return
         
-        # Group by availability status
-        by_status = {}
+        # Group by availability status and accumulate price statistics in one pass
+        by_status = defaultdict(list)
+        price_min, price_max = float('inf'), float('-inf')
+        price_sum = 0
+        price_count = 0
         for apt in apartments:
-            status = apt.get('availability', 'unknown')
-            if status not in by_status:
-                by_status[status] = []
-            by_status[status].append(apt)
+            by_status[apt.get('availability', 'unknown')].append(apt)
+            price = apt.get('price')
+            if price:
+                price_min = min(price_min, price)
+                price_max = max(price_max, price)
+                price_sum += price
+                price_count += 1
         
         # Display by status
         for status, apt_list in by_status.items():
@@ -78,10 +88,9 @@ def view_current_data():
                 print(f"   {status.title()}: {count}")
         
         # Price statistics
-        prices = [apt.get('price') for apt in apartments if apt.get('price')]
-        if prices:
-            print(f"   Price range: €{min(prices)} - €{max(prices)}")
-            print(f"   Average: €{sum(prices)/len(prices):.2f}")
+        if price_count:
+            print(f"   Price range: €{price_min} - €{price_max}")
+            print(f"   Average: €{price_sum/price_count:.2f}")
         
     except Exception as e:
         print(f"❌ Error reading data: {e}")